@@ -0,0 +1,325 @@
+"""
+Offline analytics over RoboJump telemetry logs.
+
+Streams any number of compressed event files through a generator pipeline,
+one file per pool worker, and merges the per-file results into histograms
+of scores, run lengths and session lengths and a heatmap of where players
+die. Each worker holds one event at a time and every result is a set of
+fixed-width histogram bins. Sessions are folded into their histogram once
+they end, so only those still being written stay in memory however large
+the logs grow.
+
+Example:
+    python analytics.py telemetry/ other-cabinet/telemetry/ \\
+        --out report.json
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import zlib
+
+from game_solution import TELEMETRY_DIR
+
+# Histogram bin widths
+HEATMAP_X_BIN = 40
+HEATMAP_ALTITUDE_BIN = 500
+SCORE_BIN = 100
+TICK_BIN = 250
+SESSION_BIN = 60  # seconds
+
+HOTSPOTS_SHOWN = 5
+
+
+def read_events(path):
+    """
+    Yields the events of one telemetry file in order.
+
+    Files still being written, or cut short by a crash, end without a
+    gzip trailer; their events are read up to the last complete line.
+    """
+    with gzip.open(path, "rt") as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+        except (EOFError, zlib.error):
+            return
+
+
+class Histogram:
+    """Sparse histogram counting values in bins of a fixed width."""
+
+    def __init__(self, width):
+        self.width = width
+        self.bins = {}
+
+    def add(self, value):
+        """Counts one value."""
+        index = int(value // self.width)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other):
+        """Adds the counts of another histogram with the same bins."""
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def total(self):
+        return sum(self.bins.values())
+
+    def median(self):
+        """Returns the median value, to the nearest bin."""
+        total = self.total()
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen * 2 >= total:
+                return (index + 0.5) * self.width
+        return 0.0
+
+    def report(self):
+        """Returns [(bin start, count)] in order, for JSON."""
+        return [
+            (index * self.width, self.bins[index])
+            for index in sorted(self.bins)
+        ]
+
+
+class Stats:
+    """
+    Aggregates of a set of telemetry events. Stats of separate files are
+    combined with `merge`, so files can be crunched in any order.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.events = 0
+        self.dropped = 0
+        self.causes = {}
+        self.scores = Histogram(SCORE_BIN)
+        self.run_ticks = Histogram(TICK_BIN)
+        self.deaths = {}
+
+        # Quality changes per level, and the lowest level each machine the
+        # frame budget governor degraded went down to
+        self.quality = {}
+        self.degraded = {}
+
+        # Lengths of the sessions known to be over, and the first and last
+        # event time of those that may carry on into the next file
+        self.session_seconds = Histogram(SESSION_BIN)
+        self.sessions = {}
+
+    def add(self, event):
+        """Counts one event."""
+        self.events += 1
+        kind = event.get("event")
+
+        session = event.get("session")
+        if session is not None and "time" in event:
+            first, last = self.sessions.get(
+                session, (event["time"], event["time"])
+            )
+            self.sessions[session] = (
+                min(first, event["time"]),
+                max(last, event["time"]),
+            )
+
+        if kind == "run_end":
+            cause = event.get("cause")
+            self.causes[cause] = self.causes.get(cause, 0) + 1
+            self.scores.add(event.get("score", 0))
+            self.run_ticks.add(event.get("tick", 0))
+            cell = (
+                int(event.get("x", 0) // HEATMAP_X_BIN),
+                int(event.get("altitude", 0) // HEATMAP_ALTITUDE_BIN),
+            )
+            self.deaths[cell] = self.deaths.get(cell, 0) + 1
+
+        elif kind == "dropped":
+            self.dropped += event.get("count", 0)
+
+        elif kind == "quality":
+            level = event.get("level", 0)
+            self.quality[level] = self.quality.get(level, 0) + 1
+            host = event.get("host")
+            if host is not None:
+                self.degraded[host] = max(self.degraded.get(host, 0), level)
+
+    def merge(self, other):
+        """Adds in the aggregates of another Stats."""
+        self.files += other.files
+        self.events += other.events
+        self.dropped += other.dropped
+        for cause, count in other.causes.items():
+            self.causes[cause] = self.causes.get(cause, 0) + count
+        self.scores.merge(other.scores)
+        self.run_ticks.merge(other.run_ticks)
+        for cell, count in other.deaths.items():
+            self.deaths[cell] = self.deaths.get(cell, 0) + count
+        for level, count in other.quality.items():
+            self.quality[level] = self.quality.get(level, 0) + count
+        for host, level in other.degraded.items():
+            self.degraded[host] = max(self.degraded.get(host, 0), level)
+        self.session_seconds.merge(other.session_seconds)
+        for session, (first, last) in other.sessions.items():
+            if session in self.sessions:
+                old_first, old_last = self.sessions[session]
+                first = min(first, old_first)
+                last = max(last, old_last)
+            self.sessions[session] = (first, last)
+
+    def end_sessions(self, sessions):
+        """
+        Counts the length of sessions that are over and forgets them.
+
+        Args:
+            sessions (iterable): Ids of the sessions that ended.
+        """
+        for session in sessions:
+            first, last = self.sessions.pop(session)
+            self.session_seconds.add(last - first)
+
+    def session_lengths(self):
+        """
+        Returns a Histogram of session lengths in seconds, counting the
+        sessions still open as they stand.
+        """
+        lengths = Histogram(SESSION_BIN)
+        lengths.merge(self.session_seconds)
+        for first, last in self.sessions.values():
+            lengths.add(last - first)
+        return lengths
+
+    def report(self):
+        """Returns the aggregates as a JSON-friendly dictionary."""
+        sessions = self.session_lengths()
+        return {
+            "files": self.files,
+            "events": self.events,
+            "dropped": self.dropped,
+            "runs": self.scores.total(),
+            "causes": self.causes,
+            "median_score": self.scores.median(),
+            "scores": self.scores.report(),
+            "median_run_ticks": self.run_ticks.median(),
+            "run_ticks": self.run_ticks.report(),
+            "sessions": sessions.total(),
+            "median_session_seconds": sessions.median(),
+            "session_seconds": sessions.report(),
+            "quality_changes": self.quality,
+            "degraded_hosts": self.degraded,
+            # Death counts as [x, altitude, count], by bin start
+            "death_heatmap": [
+                [x * HEATMAP_X_BIN, altitude * HEATMAP_ALTITUDE_BIN, count]
+                for (x, altitude), count in sorted(self.deaths.items())
+            ],
+        }
+
+
+def aggregate(path):
+    """Crunches one telemetry file inside a pool worker."""
+    stats = Stats()
+    stats.files = 1
+    for event in read_events(path):
+        stats.add(event)
+    return path, stats
+
+
+def find_logs(paths):
+    """Yields the telemetry files in `paths`, expanding directories."""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".jsonl.gz"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def analyse(paths, processes=None):
+    """
+    Aggregates telemetry files across a process pool.
+
+    Args:
+        paths (list): Telemetry files, or directories holding them.
+        processes (int): Number of workers, one per CPU by default.
+
+    Returns:
+        Stats: The merged aggregates.
+    """
+    total = Stats()
+    latest = {}
+    processes = processes or os.cpu_count() or 1
+    with multiprocessing.Pool(processes) as pool:
+        # Files come back in order. A session only carries on into the
+        # next file of its directory, so those of the previous file that
+        # this one doesn't continue are over and only their length is kept
+        for path, stats in pool.imap(aggregate, find_logs(paths)):
+            directory = os.path.dirname(path)
+            current = set(stats.sessions)
+            total.merge(stats)
+            total.end_sessions(latest.get(directory, set()) - current)
+            latest[directory] = current
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", default=[TELEMETRY_DIR],
+                        help="telemetry files or directories")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="pool size, one per CPU by default")
+    parser.add_argument("--out", default=None,
+                        help="file the full report is written to as JSON")
+    args = parser.parse_args(argv)
+
+    report = analyse(args.paths, args.processes).report()
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    runs = report["runs"]
+    print(
+        f"{report['files']} files, {report['events']} events",
+        f"({report['dropped']} dropped), {runs} runs,",
+        f"{report['sessions']} sessions",
+    )
+    if runs:
+        print(
+            f"median score {report['median_score']:.0f},",
+            f"median run {report['median_run_ticks']:.0f} ticks,",
+            f"median session {report['median_session_seconds']:.0f}s",
+        )
+        print(
+            "deaths:",
+            ", ".join(
+                f"{cause} {count / runs:.1%}"
+                for cause, count in report["causes"].items()
+            ),
+        )
+        hotspots = sorted(
+            report["death_heatmap"], key=lambda cell: cell[2], reverse=True
+        )
+        for x, altitude, count in hotspots[:HOTSPOTS_SHOWN]:
+            print(
+                f"  {count} deaths at x {x}-{x + HEATMAP_X_BIN},",
+                f"altitude {altitude}-{altitude + HEATMAP_ALTITUDE_BIN}",
+            )
+    if report["degraded_hosts"]:
+        print(
+            "degraded:",
+            ", ".join(
+                f"{host} down to level {level}"
+                for host, level in sorted(report["degraded_hosts"].items())
+            ),
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
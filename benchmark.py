@@ -0,0 +1,421 @@
+"""
+Benchmarks for RoboJump's headless hot paths.
+
+Run all of them with `python benchmark.py`, or name the ones to run, e.g.
+`python benchmark.py generation`.
+"""
+
+import random
+import sys
+import time
+import tkinter as tk
+
+from game_solution import (
+    ACTION_LEFT,
+    ACTION_RIGHT,
+    BEHAVIOUR_PATROL,
+    ENEMY_BEHAVIOURS,
+    FPS,
+    HEIGHT,
+    HORIZONTAL_STRENGTH,
+    JUMP_STRENGTH,
+    KIND_ENEMY,
+    KIND_SIZES,
+    KIND_TILE,
+    PLAYER_HEIGHT,
+    PLAYER_WIDTH,
+    RACE_MAX_PLAYERS,
+    SCROLL_LINE,
+    TILE_WIDTH,
+    WIDTH,
+    NullRenderer,
+    TkRenderer,
+    World,
+)
+from offscreen import OffscreenRenderer
+from tuner import idle_policy, scripted_policy
+
+
+# Heights the player's feet take off from when checking a jump, covering
+# the screen from the scroll line down to the bottom edge
+TAKEOFF_HEIGHTS = (*range(SCROLL_LINE, HEIGHT - PLAYER_HEIGHT, 50),
+                   HEIGHT - PLAYER_HEIGHT)
+
+
+def bounce_lands(from_x, to_x, rise, start_y):
+    """
+    Plays one bounce in a World holding only two tiles, independently of
+    the generator's reachability model. The player takes off from the end
+    of the first tile farthest from the second and steers for it.
+
+    Args:
+        from_x (float): Left edge of the tile the player bounces off.
+        to_x (float): Left edge of the tile to land on.
+        rise (float): How far the second tile sits above the first.
+        start_y (float): Top of the player when taking off.
+
+    Returns:
+        bool: True if the player lands on the second tile.
+    """
+    world = World(0)
+    world.generate = False
+    world.entities.clear()
+    world.spawn_entity(KIND_TILE, from_x, start_y + PLAYER_HEIGHT)
+    world.spawn_entity(KIND_TILE, to_x, start_y + PLAYER_HEIGHT - rise)
+    target = to_x + TILE_WIDTH / 2
+
+    offset = (target - from_x - TILE_WIDTH / 2 + WIDTH / 2) % WIDTH
+    if offset > WIDTH / 2:
+        x = from_x + TILE_WIDTH - 1
+    else:
+        x = from_x - PLAYER_WIDTH + 1
+    world.player_x_pos = min(max(x, 1), WIDTH - 1)
+    world.player_y_pos = world.prev_player_y_pos = start_y
+    world.player_y_velocity = JUMP_STRENGTH
+    world.player_heights = [start_y]
+
+    for tick in range(400):
+        centre = world.player_x_pos + PLAYER_WIDTH / 2
+        offset = (target - centre + WIDTH / 2) % WIDTH - WIDTH / 2
+        if offset < -HORIZONTAL_STRENGTH:
+            world.step(ACTION_LEFT)
+        elif offset > HORIZONTAL_STRENGTH:
+            world.step(ACTION_RIGHT)
+        else:
+            world.step(0)
+        if world.game_over:
+            return False
+        if world.player_y_velocity == JUMP_STRENGTH:
+            top = start_y + PLAYER_HEIGHT - rise + world.scrolled
+            return abs(world.player_y_pos + PLAYER_HEIGHT - top) < 1e-6
+    return False
+
+
+def bench_generation(platforms=100000, checked=300, seed=0):
+    """
+    Generates `platforms` tiles while ramping the difficulty far past the
+    player's jump height. A sample of `checked` of them are played out
+    with real bounces from the tiles before them, from every height in
+    TAKEOFF_HEIGHTS, to catch tiles the generator wrongly thinks are
+    reachable.
+    """
+    world = World(seed)
+    entities = world.entities
+    every = max(platforms // checked, 1)
+    generated = 0
+    unreachable = 0
+    elapsed = 0.0
+
+    while generated < platforms:
+        # Climb 100 points per spawn so the gap keeps growing
+        world.score += 100
+        before = list(world.recent_tiles)
+        count = len(entities)
+
+        start = time.perf_counter()
+        world.add_tiles()
+        elapsed += time.perf_counter() - start
+
+        if len(entities) > count and entities.kind[-1] == KIND_TILE:
+            generated += 1
+            x, y = world.recent_tiles[-1]
+            if generated % every == 0 and not any(
+                all(
+                    bounce_lands(fx, x, fy - y, start_y)
+                    for start_y in TAKEOFF_HEIGHTS
+                )
+                for fx, fy in before
+            ):
+                unreachable += 1
+
+        # Keep the store small, only the generator is being timed
+        if len(entities) > 1000:
+            entities.clear()
+
+    print(
+        f"generation: {generated} platforms in {elapsed:.3f}s",
+        f"({generated / elapsed:,.0f}/s),",
+        f"{unreachable} of {generated // every} checked unreachable,",
+        f"final space_between {world.space_between}",
+    )
+    return unreachable == 0
+
+
+def bench_render(ticks=300, seed=0):
+    """
+    Plays `ticks` ticks with each renderer and reports the cost of
+    rendering on top of the simulation, which the null renderer isolates.
+    """
+    for renderer in (NullRenderer(), OffscreenRenderer()):
+        world = World(seed)
+        renderer.start(world)
+        simulate = 0.0
+        render = 0.0
+
+        for tick in range(ticks):
+            start = time.perf_counter()
+            world.step(0)
+            if world.game_over:
+                world.reset(seed)
+            middle = time.perf_counter()
+            renderer.draw(world)
+            simulate += middle - start
+            render += time.perf_counter() - middle
+
+        print(
+            f"render {type(renderer).__name__}: simulate",
+            f"{simulate / ticks * 1e6:,.0f}us/tick, render",
+            f"{render / ticks * 1e6:,.0f}us/tick",
+        )
+
+
+# Sprites a TkRenderer draws besides the entities, screen-sized ones first
+SPRITES = ("background", "top", "player_left", "player_right")
+
+
+class NullCanvas:
+    """
+    Takes a Tk canvas's drawing calls and draws nothing, handing out item
+    ids as a canvas does. Stands in for one on machines without a display,
+    so a TkRenderer's own work is timed but not Tk's.
+    """
+
+    def __init__(self):
+        self.last_item = 0
+
+    def create_image(self, *args, **kwargs):
+        self.last_item += 1
+        return self.last_item
+
+    create_text = create_image
+
+    def coords(self, *args, **kwargs):
+        pass
+
+    delete = itemconfig = tag_raise = coords
+
+
+def tk_renderers(count):
+    """
+    Returns `count` TkRenderers drawing on hidden canvases of their own,
+    like the viewports of a race, or on NullCanvases if there's no display.
+
+    Returns:
+        tuple: (renderers, name of the canvas they draw on).
+    """
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        images = dict.fromkeys(SPRITES)
+        images["kinds"] = (None,) * len(KIND_SIZES)
+        return [
+            TkRenderer(NullCanvas(), images, None) for _ in range(count)
+        ], "NullCanvas"
+
+    root.withdraw()
+    images = {
+        key: tk.PhotoImage(master=root, width=WIDTH, height=HEIGHT)
+        for key in SPRITES[:2]
+    }
+    for key in SPRITES[2:]:
+        images[key] = tk.PhotoImage(
+            master=root, width=PLAYER_WIDTH, height=PLAYER_HEIGHT
+        )
+    images["kinds"] = tuple(
+        tk.PhotoImage(master=root, width=width, height=height)
+        for width, height in KIND_SIZES
+    )
+    return [
+        TkRenderer(
+            tk.Canvas(root, width=WIDTH, height=HEIGHT),
+            images,
+            "TkDefaultFont",
+        )
+        for _ in range(count)
+    ], "Tk canvas"
+
+
+def bench_race(ticks=5000, seed=0):
+    """
+    Times a split-screen race tick, every player stepping their own World
+    of the same level and drawing it in their own viewport, against the
+    FPS budget. The 99th percentile tick must fit in the budget.
+    """
+    worlds = [World(seed) for _ in range(RACE_MAX_PLAYERS)]
+    policies = [scripted_policy(random.Random(i)) for i in range(len(worlds))]
+    renderers, canvas = tk_renderers(len(worlds))
+    for world, renderer in zip(worlds, renderers):
+        renderer.start(world)
+    costs = []
+
+    for tick in range(ticks):
+        # Players' inputs come from the keyboard in a race, not a policy
+        actions = [policy(world) for world, policy in zip(worlds, policies)]
+
+        start = time.perf_counter()
+        for world, action, renderer in zip(worlds, actions, renderers):
+            world.step(action)
+            renderer.draw(world)
+        costs.append(time.perf_counter() - start)
+
+        for world, renderer in zip(worlds, renderers):
+            if world.game_over:
+                world.reset(seed)
+                renderer.canvas.delete("all")
+                renderer.start(world)
+
+    costs.sort()
+    p99 = costs[len(costs) * 99 // 100]
+    print(
+        f"race: {RACE_MAX_PLAYERS} players drawn on {canvas},",
+        f"{sum(costs) / ticks * 1e6:,.0f}us/tick average,",
+        f"{p99 * 1e6:,.0f}us p99, budget {FPS * 1000:,}us",
+    )
+    return p99 * 1000 < FPS
+
+
+def bench_enemies(enemies=500, ticks=2000, seed=0):
+    """
+    Stress scenario: `enemies` enemies, spread evenly over every behaviour,
+    all in view at once and level with the player. Times whole ticks, the
+    World stepping and the game's Tk renderer drawing it, against the FPS
+    budget. The player is held in a lane at the left edge, and enemies that
+    wander into it are moved back out between ticks, so the run never
+    ends. The 99th percentile tick must fit in the budget.
+    """
+    world = World(seed)
+    world.generate = False
+    world.entities.clear()
+    # Off x 0, which check_horizontal_bound wraps to the right edge
+    world.player_x_pos = 1
+    middle = HEIGHT / 2
+    lane = PLAYER_WIDTH * 2
+    top = middle - KIND_SIZES[KIND_ENEMY][1] + 1
+    bottom = middle + PLAYER_HEIGHT - 1
+
+    rng = random.Random(seed)
+    for i in range(enemies):
+        behaviour = i % len(ENEMY_BEHAVIOURS)
+        x = rng.uniform(lane, WIDTH - TILE_WIDTH)
+        world.spawn_entity(
+            KIND_ENEMY,
+            x,
+            rng.uniform(top, bottom),
+            ENEMY_BEHAVIOURS[behaviour]["speed"],
+            behaviour,
+            # A patroller's state is the left edge of its tile
+            state=x if behaviour == BEHAVIOUR_PATROL else rng.randrange(300),
+        )
+    (renderer,), canvas = tk_renderers(1)
+    renderer.start(world)
+    entities = world.entities
+    costs = []
+
+    for tick in range(ticks):
+        # The player hangs level with the enemies instead of falling, and
+        # drifters are put back before they wrap around into the lane
+        world.player_y_pos = middle
+        world.player_y_velocity = 0
+        for i in range(len(entities)):
+            if not lane <= entities.x[i] <= WIDTH - PLAYER_WIDTH:
+                entities.x[i] = lane
+
+        start = time.perf_counter()
+        world.step(0)
+        renderer.draw(world)
+        costs.append(time.perf_counter() - start)
+
+    costs.sort()
+    p99 = costs[len(costs) * 99 // 100]
+    print(
+        f"enemies: {enemies} enemies drawn on {canvas},",
+        f"{sum(costs) / ticks * 1e6:,.0f}us/tick average,",
+        f"{p99 * 1e6:,.0f}us p99, budget {FPS * 1000:,}us,",
+        f"game over: {world.game_over}",
+    )
+    return p99 * 1000 < FPS and not world.game_over
+
+
+def world_state(world):
+    """Returns everything about a world that stepping can change."""
+    entities = world.entities
+    return (
+        world.state(),
+        world.ticks,
+        world.game_over,
+        world.death_cause,
+        world.prev_player_y_pos,
+        world.random.getstate(),
+        list(entities.x),
+        list(entities.y),
+        list(entities.kind),
+        list(entities.state),
+    )
+
+
+def bench_replay(runs=200, max_ticks=3000):
+    """
+    Records `runs` games, alternating between the idle and scripted
+    policies, then replays each one tick by tick and with World.replay,
+    which fast-forwards idle ticks. Every replay must end in exactly the
+    same state as the tick-by-tick one.
+    """
+    stepped = 0.0
+    replayed = 0.0
+    ticks = 0
+    mismatches = 0
+
+    for seed in range(runs):
+        world = World(seed)
+        policy = (idle_policy, scripted_policy)[seed % 2]
+        choose = policy(random.Random(seed))
+        actions = bytearray()
+        while world.ticks < max_ticks and not world.game_over:
+            actions.append(choose(world))
+            world.step(actions[-1])
+        ticks += len(actions)
+
+        world = World(seed)
+        start = time.perf_counter()
+        for action in actions:
+            world.step(action)
+            if world.game_over:
+                break
+        stepped += time.perf_counter() - start
+        expected = world_state(world)
+
+        world = World(seed)
+        start = time.perf_counter()
+        world.replay(actions)
+        replayed += time.perf_counter() - start
+        if world_state(world) != expected:
+            mismatches += 1
+
+    print(
+        f"replay: {runs} runs, {ticks} ticks,",
+        f"stepped {stepped / ticks * 1e6:,.1f}us/tick,",
+        f"fast-forwarded {replayed / ticks * 1e6:,.1f}us/tick,",
+        f"{mismatches} mismatches",
+    )
+    return mismatches == 0
+
+
+BENCHMARKS = {
+    "generation": bench_generation,
+    "render": bench_render,
+    "race": bench_race,
+    "enemies": bench_enemies,
+    "replay": bench_replay,
+}
+
+
+def main(argv=None):
+    names = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    ok = True
+    for name in names:
+        ok = BENCHMARKS[name]() is not False and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
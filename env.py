@@ -0,0 +1,294 @@
+"""
+Headless training environments for RoboJump.
+
+RoboJumpEnv wraps a single World behind a reset/step interface in the style
+of Gym, and VectorEnv runs many of them across worker processes that write
+their observations straight into shared memory.
+"""
+
+import heapq
+import multiprocessing
+import os
+from array import array
+
+from game_solution import (
+    HEIGHT,
+    KIND_ENEMY,
+    WIDTH,
+    World,
+)
+
+# Observation layout: player x, y, x velocity, y velocity and jetpack flag,
+# then (dx, dy, kind) for the nearest entities, kind being 0 for an empty
+# slot, 1 for a tile and 2 for an enemy
+NEARBY_ENTITIES = 8
+PLAYER_FEATURES = 5
+OBSERVATION_SIZE = PLAYER_FEATURES + 3 * NEARBY_ENTITIES
+
+
+def observe(world, out, offset=0):
+    """
+    Writes the observation of a world into a float buffer.
+
+    Args:
+        world (World): The world to observe.
+        out: Writable float buffer, such as an array or memoryview.
+        offset (int): Index in `out` of the observation's first value.
+    """
+    out[offset] = world.player_x_pos
+    out[offset + 1] = world.player_y_pos
+    out[offset + 2] = world.player_x_velocity
+    out[offset + 3] = world.player_y_velocity
+    out[offset + 4] = 1.0 if world.is_jetpack_on else 0.0
+
+    entities = world.entities
+    x = world.player_x_pos
+    y = world.player_y_pos
+
+    # Only entities on screen are candidates, nearest first
+    nearby = heapq.nsmallest(
+        NEARBY_ENTITIES,
+        (
+            ((entities.x[i] - x) ** 2 + (entities.y[i] - y) ** 2, i)
+            for i in range(len(entities))
+            if entities.in_view_band(i)
+        ),
+    )
+
+    index = offset + PLAYER_FEATURES
+    for _, i in nearby:
+        out[index] = entities.x[i] - x
+        out[index + 1] = entities.y[i] - y
+        out[index + 2] = 2.0 if entities.kind[i] == KIND_ENEMY else 1.0
+        index += 3
+
+    # Pad the unused slots
+    end = offset + OBSERVATION_SIZE
+    while index < end:
+        out[index] = 0.0
+        index += 1
+
+
+class RoboJumpEnv:
+    """
+    Single RoboJump run with a Gym-style interface.
+
+    Actions are the ACTION_* bitmasks used by the game loop, so 0 stands
+    still, ACTION_LEFT and ACTION_RIGHT move and ACTION_JETPACK toggles the
+    jetpack. The reward for a step is the score gained during it.
+    """
+
+    observation_size = OBSERVATION_SIZE
+    screen_size = (WIDTH, HEIGHT)
+
+    def __init__(self, max_steps=None, seed=None):
+        """
+        Creates the environment.
+
+        Args:
+            max_steps (int): Truncates runs after this many steps, or never
+            if None.
+            seed: Seed for the first reset.
+        """
+        self.max_steps = max_steps
+        self.world = World(seed)
+        self.observation = array("f", bytes(4 * OBSERVATION_SIZE))
+
+    def reset(self, seed=None):
+        """
+        Starts a new run.
+
+        Args:
+            seed: Reseeds the level generator when given.
+
+        Returns:
+            tuple: (observation, info)
+        """
+        self.world.reset(seed)
+        observe(self.world, self.observation)
+        return self.observation, {}
+
+    def step(self, action):
+        """
+        Advances the run by one tick.
+
+        Args:
+            action (int): Bitmask of ACTION_* flags.
+
+        Returns:
+            tuple: (observation, reward, terminated, truncated, info)
+        """
+        world = self.world
+        reward = world.step(action)
+        observe(world, self.observation)
+
+        terminated = world.game_over
+        truncated = (
+            not terminated
+            and self.max_steps is not None
+            and world.ticks >= self.max_steps
+        )
+        info = {"score": world.score, "death_cause": world.death_cause}
+        return self.observation, reward, terminated, truncated, info
+
+
+def _worker(connection, start, stop, buffers, max_steps, seed):
+    """
+    Runs envs `start` to `stop` of a VectorEnv inside a worker process.
+
+    Commands arrive over `connection` and results are written into the
+    shared `buffers`, so only a short acknowledgement goes back.
+    """
+    observations, rewards, terminated, truncated, actions = buffers
+    envs = [
+        RoboJumpEnv(max_steps, None if seed is None else seed + i)
+        for i in range(start, stop)
+    ]
+
+    while True:
+        command, argument = connection.recv()
+
+        if command == "step":
+            for i, env in enumerate(envs, start):
+                _, reward, done, cut, _ = env.step(actions[i])
+                rewards[i] = reward
+                terminated[i] = done
+                truncated[i] = cut
+
+                # Finished runs restart straight away
+                if done or cut:
+                    env.reset()
+                observe(env.world, observations, i * OBSERVATION_SIZE)
+
+        elif command == "reset":
+            for i, env in enumerate(envs, start):
+                env.reset(None if argument is None else argument + i)
+                observe(env.world, observations, i * OBSERVATION_SIZE)
+
+        elif command == "close":
+            connection.close()
+            return
+
+        connection.send(None)
+
+
+class VectorEnv:
+    """
+    Runs `num_envs` RoboJump environments split across worker processes.
+
+    Observations, rewards, done flags and actions live in shared memory, so
+    a step only sends one short message to each worker. Results are returned
+    as memoryviews over the shared buffers (numpy.asarray can wrap them
+    without copying) and are overwritten by the next call. Runs that end
+    are reset automatically, so the observation after a done flag is the
+    first one of the next run.
+    """
+
+    def __init__(self, num_envs, processes=None, max_steps=None, seed=None):
+        """
+        Starts the worker processes.
+
+        Args:
+            num_envs (int): Number of environments.
+            processes (int): Number of workers, one per CPU by default.
+            max_steps (int): Truncates runs after this many steps.
+            seed: Env i is seeded with seed + i when given.
+        """
+        self.num_envs = num_envs
+        processes = min(num_envs, processes or os.cpu_count() or 1)
+
+        self._observations = multiprocessing.RawArray(
+            "f", num_envs * OBSERVATION_SIZE
+        )
+        self._rewards = multiprocessing.RawArray("d", num_envs)
+        self._terminated = multiprocessing.RawArray("b", num_envs)
+        self._truncated = multiprocessing.RawArray("b", num_envs)
+        self._actions = multiprocessing.RawArray("b", num_envs)
+        buffers = (
+            self._observations,
+            self._rewards,
+            self._terminated,
+            self._truncated,
+            self._actions,
+        )
+
+        self.observations = (
+            memoryview(self._observations)
+            .cast("B")
+            .cast("f", (num_envs, OBSERVATION_SIZE))
+        )
+        self.rewards = memoryview(self._rewards).cast("B").cast("d")
+        self.terminated = memoryview(self._terminated).cast("B").cast("b")
+        self.truncated = memoryview(self._truncated).cast("B").cast("b")
+
+        # Give each worker an even, contiguous share of the envs
+        self.connections = []
+        self.workers = []
+        for worker in range(processes):
+            start = num_envs * worker // processes
+            stop = num_envs * (worker + 1) // processes
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(child, start, stop, buffers, max_steps, seed),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.workers.append(process)
+
+    def _broadcast(self, command, argument=None):
+        """Sends a command to every worker and waits until all are done."""
+        for connection in self.connections:
+            connection.send((command, argument))
+        for connection in self.connections:
+            connection.recv()
+
+    def reset(self, seed=None):
+        """
+        Starts a new run in every environment.
+
+        Args:
+            seed: Env i is reseeded with seed + i when given.
+
+        Returns:
+            memoryview: Observations, shaped (num_envs, OBSERVATION_SIZE).
+        """
+        self._broadcast("reset", seed)
+        return self.observations
+
+    def step(self, actions):
+        """
+        Advances every environment by one tick.
+
+        Args:
+            actions: One ACTION_* bitmask per environment.
+
+        Returns:
+            tuple: (observations, rewards, terminated, truncated)
+        """
+        self._actions[:] = actions
+        self._broadcast("step")
+        return (
+            self.observations,
+            self.rewards,
+            self.terminated,
+            self.truncated,
+        )
+
+    def close(self):
+        """Stops the worker processes."""
+        for connection in self.connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.workers:
+            process.join()
+        self.connections = []
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
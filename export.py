@@ -0,0 +1,172 @@
+"""
+Exports a recorded RoboJump run as an image sequence, without a display.
+
+The run is simulated once to take a snapshot of the world at the start of
+each chunk of frames. Worker processes then pick up the chunks, each
+seeking straight to its snapshot, so every core renders its own share of
+the run instead of replaying it from the start.
+
+Example:
+    python export.py recordings/1700000000000000000.json --out frames \\
+        --format png
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+
+from game_solution import (
+    Recording,
+    apply_config,
+    apply_tuning,
+    load_config,
+    physics,
+)
+from offscreen import OffscreenRenderer
+
+# Frames are split into a few chunks per worker, so the workers that
+# finish early pick up the remaining chunks and all finish together
+CHUNKS_PER_WORKER = 4
+
+# Each worker process loads the sprites once and renders all its chunks
+_renderer = None
+
+
+def _init_worker(assets):
+    global _renderer
+    _renderer = OffscreenRenderer(assets=assets)
+
+
+def render_chunk(task):
+    """
+    Renders one chunk of frames inside a pool worker.
+
+    Frame i shows the world after i ticks of the recording, as the game
+    drew it, so a run of n ticks has n frames.
+
+    Returns:
+        int: Number of frames written.
+    """
+    snapshot, first, actions, constants, tunings, pattern = task
+    world = pickle.loads(snapshot)
+    apply_config(constants)
+
+    for offset, action in enumerate(actions):
+        config = tunings.get(first + offset)
+        if config is not None:
+            apply_tuning(world, config)
+        _renderer.draw(world)
+        _renderer.save(pattern % (first + offset))
+        world.step(action)
+
+    return len(actions)
+
+
+def plan(recording, chunks):
+    """
+    Replays a recording once, taking a snapshot at the start of each chunk.
+
+    Args:
+        recording (Recording): The run to export.
+        chunks (int): How many chunks to split the frames into.
+
+    Returns:
+        list: (snapshot, first frame, actions, physics, tunings) for each
+        chunk, the snapshot being the pickled World at that frame, physics
+        the constants in effect then and tunings the config reloads
+        recorded during the chunk.
+    """
+    actions = recording.actions
+    size = max(1, math.ceil(len(actions) / chunks))
+    world = recording.world()
+    tasks = []
+
+    for first in range(0, len(actions), size):
+        tasks.append(
+            (
+                pickle.dumps(world.snapshot()),
+                first,
+                bytes(actions[first: first + size]),
+                physics(),
+                {
+                    tick: config
+                    for tick, config in recording.tunings.items()
+                    if first <= tick < first + size
+                },
+            )
+        )
+        recording.replay(world, first + size)
+
+    # A run that doesn't replay to its score was recorded by other rules
+    if recording.score is not None and world.score != recording.score:
+        raise ValueError(
+            f"replay scored {world.score}, recording says {recording.score}"
+        )
+    return tasks
+
+
+def export(
+    recording, out, image_format="ppm", processes=None, assets="files"
+):
+    """
+    Renders every frame of a recording into `out`.
+
+    Args:
+        recording (Recording): The run to export.
+        out (str): Directory for the frames, created if missing.
+        image_format (str): "ppm" or "png".
+        processes (int): Number of workers, one per CPU by default.
+        assets (str): Directory holding the sprite files.
+
+    Returns:
+        int: Number of frames written.
+    """
+    os.makedirs(out, exist_ok=True)
+    pattern = os.path.join(out, f"frame_%06d.{image_format}")
+    processes = processes or os.cpu_count() or 1
+
+    tasks = [
+        task + (pattern,)
+        for task in plan(recording, processes * CHUNKS_PER_WORKER)
+    ]
+    written = 0
+    with multiprocessing.Pool(
+        processes, initializer=_init_worker, initargs=(assets,)
+    ) as pool:
+        for frames in pool.imap_unordered(render_chunk, tasks):
+            written += frames
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("recording", help="recording file to export")
+    parser.add_argument("--out", default="frames",
+                        help="directory the frames are written to")
+    parser.add_argument("--format", choices=("ppm", "png"), default="ppm")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="pool size, one per CPU by default")
+    parser.add_argument("--assets", default="files",
+                        help="directory holding the sprite files")
+    args = parser.parse_args(argv)
+
+    # Only recordings from before physics were recorded need the config
+    load_config()
+    recording = Recording.load(args.recording)
+    start = time.perf_counter()
+    frames = export(
+        recording, args.out, args.format, args.processes, args.assets
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{frames} frames of {recording.name}'s run ({recording.score})",
+        f"written to {args.out} in {elapsed:.1f}s",
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
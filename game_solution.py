@@ -1,6 +1,19 @@
+import gzip
+import itertools
 import json
+import math
+import mmap
+import os
 import random
+import socket
+import struct
+import sys
+import threading
+import time
 import tkinter as tk
+from array import array
+from collections import deque
+from fractions import Fraction
 from tkinter import font
 
 WIDTH = 480
@@ -20,6 +33,2630 @@ LEADERBOARD_FILE = "scores.txt"
 SAVE_FILE = "game_save.json"
 FPS = 3
 
+# Config file of live-tunable physics and difficulty, and milliseconds
+# between checks of it for changes
+CONFIG_FILE = "config.json"
+CONFIG_POLL_MS = 1000
+
+# Display scaling: the scale snaps down to steps of 1 / SCALE_STEP so sprites
+# can be scaled with PhotoImage.zoom and subsample, and scaled sprites are
+# cached on disk under SCALED_CACHE_DIR
+SCALE_STEP = 2
+MIN_SCALE = Fraction(1, 2)
+SCALED_CACHE_DIR = "files/scaled"
+
+# Sprite of each RoboJump image attribute
+IMAGE_FILES = {
+    "background_image": "background.png",
+    "boss_image": "boss_image.png",
+    "leaderboard_bg_image": "leaderboard_bg.png",
+    "gameover_bg_image": "game_over_bg.png",
+    "player_right_image": "bird_right.png",
+    "player_left_image": "bird_left.png",
+    "main_menu_image": "main_menu.png",
+    "tile_image": "regular_tile.png",
+    "enemy_image": "enemy.png",
+    "save_game_btn_image": "save_game_btn_image.png",
+    "leaderboard_btn_image": "leaderboard_btn_image.png",
+    "menu_btn_image": "menu_btn_image.png",
+    "options_btn_image": "options_btn_image.png",
+    "play_btn_image": "play_btn_image.png",
+    "saves_btn_image": "saves_btn_image.png",
+    "submit_name_btn_image": "submit_name_btn_image.png",
+    "options_screen_image": "options_bg.png",
+    "top_image": "top.png",
+    "pause_btn_image": "pause_btn.png",
+    "play_icon_image": "play_btn.png",
+    "pause_screen_image": "paused_bg.png",
+}
+
+# Split-screen races: the most players, and the (left, right, jetpack) keys
+# of every player after the first, who uses the configured bindings
+RACE_MAX_PLAYERS = 4
+RACE_BINDS = (
+    ("a", "d", "w"),
+    ("f", "h", "t"),
+    ("KP_4", "KP_6", "KP_8"),
+)
+
+# Frame cost readout: weight of each new frame in the running average,
+# and how many frames between updates of the text
+FRAME_COST_SMOOTHING = 0.05
+FRAME_COST_READOUT = 30
+
+# Frame budget governor: quality drops a level while the running average
+# frame cost is over the budget of FPS milliseconds, and comes back a level
+# after GOVERNOR_RESTORE frames in a row under GOVERNOR_HEADROOM of it.
+# After each change it waits GOVERNOR_SETTLE frames for the average to
+# catch up
+GOVERNOR_HEADROOM = 0.5
+GOVERNOR_SETTLE = 60
+GOVERNOR_RESTORE = 600
+
+# Quality levels, best first: frames between canvas updates of the menu
+# animation and of the score, frames between canvas moves of enemies more
+# than DISTANT_ENEMY pixels above or below the player, and the share of
+# its search budget the autopilot gets
+DISTANT_ENEMY = HEIGHT / 2
+QUALITY_LEVELS = (
+    {"menu_every": 1, "hud_every": 1, "distant_every": 1, "lookahead": 1.0},
+    {"menu_every": 2, "hud_every": 2, "distant_every": 1, "lookahead": 1.0},
+    {"menu_every": 4, "hud_every": 4, "distant_every": 2, "lookahead": 0.5},
+    {"menu_every": 8, "hud_every": 8, "distant_every": 4, "lookahead": 0.25},
+)
+
+# Recordings of runs, replayable and exportable
+RECORDINGS_DIR = "recordings"
+RECORDINGS_KEPT = 5  # only the best runs' recordings are kept
+
+# Ghosts raced when switched on, and the layout of the position traces that
+# drive them: a header, the player's name, then an int16 (dx, daltitude)
+# pair per tick, all little-endian
+GHOSTS_SHOWN = 5
+TRACE_MAGIC = b"RJT1"
+TRACE_HEADER = struct.Struct("<4sIiidB")
+TRACE_STEP = struct.Struct("<hh")
+
+# Telemetry: events buffered before new ones are dropped, seconds between
+# flushes, uncompressed bytes per file before rotating and files kept
+TELEMETRY_DIR = "telemetry"
+TELEMETRY_CAPACITY = 4096
+TELEMETRY_INTERVAL = 1.0
+TELEMETRY_FILE_BYTES = 1 << 20
+TELEMETRY_KEPT = 50
+
+# Difficulty ramp used by add_tiles: the starting gap between tiles and
+# enemy chance, and how much each grows every `level_step` points
+DIFFICULTY = {
+    "enemy_chance": 0.1,
+    "enemy_step": 0.02,
+    "space_between": 50,
+    "space_step": 50,
+    "level_step": 1000,
+}
+
+# Config file keys of the physics constants that can be tuned live
+TUNABLE_CONSTANTS = {
+    "gravity": "GRAVITY",
+    "jump_strength": "JUMP_STRENGTH",
+    "horizontal_strength": "HORIZONTAL_STRENGTH",
+    "jetpack_strength": "JETPACK_STRENGTH",
+    "fps": "FPS",
+}
+
+# Entity kinds, stored as small integers so type checks are int compares
+KIND_TILE = 0
+KIND_ENEMY = 1
+
+# Per-kind (width, height) and canvas tag, indexed by kind
+KIND_SIZES = (
+    (TILE_WIDTH, TILE_HEIGHT),
+    (PLAYER_WIDTH, TILE_HEIGHT),
+)
+KIND_TAGS = ("tile", "enemy")
+ENEMY_SPEED = 1
+
+# Enemy behaviours, indexed by the number stored in Entities.behaviour.
+# Each is moved by the World method named by "move", in one pass over all
+# enemies with that behaviour, and tuned by the rest of its entry. Once the
+# score reaches "from_score" a behaviour can spawn, picked by "weight"
+# among those that can. A flyer's period is in ticks
+BEHAVIOUR_DRIFT = 0
+BEHAVIOUR_SINE = 1
+BEHAVIOUR_CHASE = 2
+BEHAVIOUR_PATROL = 3
+ENEMY_BEHAVIOURS = (
+    {
+        "name": "drifter",
+        "move": "move_drifters",
+        "speed": ENEMY_SPEED,
+        "weight": 4,
+        "from_score": 0,
+    },
+    {
+        "name": "flyer",
+        "move": "move_flyers",
+        "speed": ENEMY_SPEED,
+        "amplitude": 40,
+        "period": 300,
+        "weight": 2,
+        "from_score": 2000,
+    },
+    {
+        "name": "chaser",
+        "move": "move_chasers",
+        "speed": 0.75,
+        "weight": 1,
+        "from_score": 4000,
+    },
+    {
+        "name": "patroller",
+        "move": "move_patrollers",
+        "speed": 1,
+        "weight": 2,
+        "from_score": 1000,
+    },
+)
+
+# Level generation: how many of the latest tiles a new one may be reached
+# from, and how many random spots are tried before falling back to a safe one
+RECENT_TILES = 4
+GENERATION_TRIES = 8
+
+# Bits of the per-tick action sampled from the keyboard
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_JETPACK = 4
+
+
+class Entities:
+    """
+    Structure-of-arrays store for every tile and enemy in the game.
+
+    Each entity is a row index shared by the parallel arrays below, so the
+    game logic can iterate positions, sizes and kinds without asking the
+    canvas. The canvas item for each row is kept alongside in `items`.
+    Adding a new platform kind only needs a new row in `KIND_SIZES` and
+    `KIND_TAGS`.
+
+    Enemies also keep their index into ENEMY_BEHAVIOURS in `behaviour`,
+    whatever state that behaviour needs in `state`, and how far they moved
+    down in the last tick in `y_velocity`.
+    """
+
+    __slots__ = (
+        "x",
+        "y",
+        "width",
+        "height",
+        "x_velocity",
+        "y_velocity",
+        "kind",
+        "behaviour",
+        "state",
+        "items",
+    )
+
+    def __init__(self):
+        """Creates an empty entity store."""
+        self.clear()
+
+    def __len__(self):
+        return len(self.kind)
+
+    def clear(self):
+        """Removes every entity from the store."""
+        self.x = array("d")
+        self.y = array("d")
+        self.width = array("d")
+        self.height = array("d")
+        self.x_velocity = array("d")
+        self.y_velocity = array("d")
+        self.kind = array("b")
+        self.behaviour = array("b")
+        self.state = array("d")
+        self.items = array("l")
+
+    def copy(self, top=-math.inf, bottom=math.inf):
+        """
+        Returns a copy of the store without canvas items, keeping only
+        entities whose top edge lies between `top` and `bottom`.
+
+        Args:
+            top (float): Highest top edge to keep.
+            bottom (float): Lowest top edge to keep.
+        """
+        copy = Entities()
+        if top == -math.inf and bottom == math.inf:
+            # Whole columns copy at C speed
+            copy.x = array("d", self.x)
+            copy.y = array("d", self.y)
+            copy.width = array("d", self.width)
+            copy.height = array("d", self.height)
+            copy.x_velocity = array("d", self.x_velocity)
+            copy.y_velocity = array("d", self.y_velocity)
+            copy.kind = array("b", self.kind)
+            copy.behaviour = array("b", self.behaviour)
+            copy.state = array("d", self.state)
+            copy.items = array("l", bytes(copy.items.itemsize * len(self)))
+            return copy
+
+        for i in range(len(self.kind)):
+            if top <= self.y[i] <= bottom:
+                copy.add(
+                    self.kind[i],
+                    self.x[i],
+                    self.y[i],
+                    self.x_velocity[i],
+                    behaviour=self.behaviour[i],
+                    state=self.state[i],
+                )
+        return copy
+
+    def forget_items(self):
+        """Drops every canvas item reference, e.g. after clearing a canvas."""
+        for i in range(len(self.items)):
+            self.items[i] = 0
+
+    def add(self, kind, x, y, x_velocity=0, item=0, behaviour=0, state=0):
+        """
+        Appends a new entity and returns its row index.
+
+        Args:
+            kind (int): One of the KIND_* constants.
+            x (float): Left edge of the entity.
+            y (float): Top edge of the entity.
+            x_velocity (float): Horizontal speed per tick.
+            item (int): Canvas item drawing the entity, 0 if none.
+            behaviour (int): Index into ENEMY_BEHAVIOURS, for enemies.
+            state (float): Starting state of the behaviour.
+        """
+        width, height = KIND_SIZES[kind]
+        self.x.append(x)
+        self.y.append(y)
+        self.width.append(width)
+        self.height.append(height)
+        self.x_velocity.append(x_velocity)
+        self.y_velocity.append(0)
+        self.kind.append(kind)
+        self.behaviour.append(behaviour)
+        self.state.append(state)
+        self.items.append(item)
+        return len(self.kind) - 1
+
+    def remove(self, index):
+        """
+        Removes the entity at `index` by moving the last row into its place,
+        so the last row changes index and the order of rows is not kept.
+        When removing while looping over the store, iterate backwards (or
+        over a copy): a forward loop would skip the row moved into `index`.
+
+        Args:
+            index (int): Row of the entity to remove.
+        """
+        for column in (
+            self.x,
+            self.y,
+            self.width,
+            self.height,
+            self.x_velocity,
+            self.y_velocity,
+            self.kind,
+            self.behaviour,
+            self.state,
+            self.items,
+        ):
+            column[index] = column[-1]
+            column.pop()
+
+    def in_view_band(self, index):
+        """
+        Returns True if the entity overlaps the visible rows of the canvas.
+
+        Args:
+            index (int): Row of the entity to check.
+        """
+        y = self.y[index]
+        return y + self.height[index] > 0 and y < HEIGHT
+
+    def in_view(self, index):
+        """
+        Returns True if any part of the entity is inside the canvas.
+
+        Args:
+            index (int): Row of the entity to check.
+        """
+        x = self.x[index]
+        return (
+            x + self.width[index] > 0
+            and x < WIDTH
+            and self.in_view_band(index)
+        )
+
+
+def arc_offset(velocity, ticks):
+    """
+    Returns how far the player has moved down after `ticks` ticks of free
+    flight, starting with vertical `velocity`. This is the closed form of
+    the game loop's "velocity += GRAVITY, position += velocity" update.
+
+    Args:
+        velocity (float): Vertical velocity before the first tick.
+        ticks (int): Number of ticks to advance.
+    """
+    return ticks * velocity + GRAVITY * ticks * (ticks + 1) / 2
+
+
+def ticks_to_cross(velocity, offset):
+    """
+    Returns the first tick at which free flight moving down reaches or
+    passes `offset` pixels below the start, or None if the arc never gets
+    that high. Negative offsets are heights above the start, which are met
+    on the way back down.
+
+    Args:
+        velocity (float): Vertical velocity before the first tick.
+        offset (float): Target offset, positive is down the screen.
+    """
+    # Larger root of GRAVITY/2 n^2 + (velocity + GRAVITY/2) n - offset = 0
+    b = velocity + GRAVITY / 2
+    discriminant = b * b + 2 * GRAVITY * offset
+    if discriminant < 0:
+        return None
+
+    root = (-b + math.sqrt(discriminant)) / GRAVITY
+    return max(1, math.ceil(root - 1e-9))
+
+
+def scrolled_arc(start_y, landed_y=None):
+    """
+    Returns the path of one bounce relative to the tiles, as a tuple of
+    offsets per tick until the player is back at the take-off height.
+
+    Unlike the plain arc this follows the scrolling rule in move_objects
+    tick for tick, where climbing above the scroll line moves the tiles
+    instead of the player. The scroll distance is measured from the height
+    recorded on the tick before, ahead of that tick's own scroll, so a jump
+    that crosses the line partway bobs around it and climbs less relative
+    to the tiles.
+
+    Args:
+        start_y (float): Player's y position on screen at take-off.
+        landed_y (float): Height recorded on the tick the player landed,
+        before it was stood on the tile, `start_y` if None.
+
+    Returns:
+        tuple: The offsets, or None if the bounce takes the player off the
+        bottom of the screen.
+    """
+    y = start_y
+    recorded = start_y if landed_y is None else landed_y
+    velocity = JUMP_STRENGTH
+    offset = 0
+    offsets = [0]
+
+    while velocity < 0 or offset < 0:
+        previous_y = y
+        velocity += GRAVITY
+        y += velocity
+        if y >= HEIGHT:
+            return None
+
+        distance = 0
+        if y <= SCROLL_LINE and velocity <= 0:
+            distance = recorded - y
+        recorded = y
+        y += distance * 2
+
+        offset += y - previous_y - distance * 1.6
+        offsets.append(offset)
+
+    return tuple(offsets)
+
+
+def takeoff_states():
+    """
+    Yields (start_y, landed_y) for scrolled_arc covering every take-off a
+    bounce can make. A bouncing player never climbs above the scroll line,
+    so it takes off anywhere from there down to the bottom of the screen.
+    How far it overshot the tile on the landing tick only matters when the
+    first tick of the jump scrolls, and is at most the speed of a fall from
+    the scroll line.
+    """
+    start_y = SCROLL_LINE
+    while start_y <= HEIGHT - PLAYER_HEIGHT:
+        if start_y + JUMP_STRENGTH + GRAVITY > SCROLL_LINE:
+            yield start_y, start_y
+        else:
+            fall = math.sqrt(2 * GRAVITY * (start_y - SCROLL_LINE))
+            for share in range(JUMP_ENVELOPE_SPEEDS + 1):
+                overshoot = (fall + 2 * GRAVITY) * share / JUMP_ENVELOPE_SPEEDS
+                yield start_y, start_y + overshoot
+        start_y += JUMP_ENVELOPE_STEP
+
+
+def horizontal_gap(from_x, to_x):
+    """
+    Returns how far the player has to travel sideways to get from standing
+    anywhere on the tile at `from_x` to anywhere over the tile at `to_x`,
+    taking the wrap-around in check_horizontal_bound into account.
+
+    Args:
+        from_x (float): Left edge of the take-off tile.
+        to_x (float): Left edge of the target tile.
+    """
+    distance = abs(to_x - from_x) % WIDTH
+    distance = min(distance, WIDTH - distance)
+    return max(0, distance - (TILE_WIDTH + PLAYER_WIDTH - 2))
+
+
+def landing_tick(rise):
+    """
+    Returns the earliest tick of a bounce at which the player can come down
+    onto a tile `rise` pixels above the one it jumped from, or None if it
+    is out of reach. Uses the jump envelope, so the answer holds for a
+    take-off anywhere on screen.
+
+    Args:
+        rise (float): Height of the target tile above the take-off tile.
+    """
+    if rise > SAFE_JUMP_APEX:
+        return None
+
+    # Rounding the rise up only makes the landing earlier. A tile below
+    # the take-off is treated as level with it, which errs the same way
+    return SAFE_LANDING_TICKS[max(0, math.ceil(rise))]
+
+
+def is_reachable(from_x, from_y, to_x, to_y):
+    """
+    Returns True if a bounce from the tile at (from_x, from_y) can land on
+    the tile at (to_x, to_y). Runs in constant time using the jump tables.
+
+    Args:
+        from_x, from_y (float): Top-left corner of the take-off tile.
+        to_x, to_y (float): Top-left corner of the target tile.
+    """
+    ticks = landing_tick(from_y - to_y)
+    if ticks is None:
+        return False
+    return horizontal_gap(from_x, to_x) <= ticks * HORIZONTAL_STRENGTH
+
+
+def next_landing(x, y, velocity, entities):
+    """
+    Finds the next tile the player lands on if it carries on in free flight
+    straight up or down with no scrolling, without stepping through the
+    ticks. A rising player can land on a tile above its feet on the way
+    back down.
+
+    Args:
+        x, y (float): Player's top-left corner.
+        velocity (float): Player's vertical velocity.
+        entities (Entities): Tiles and enemies to check.
+
+    Returns:
+        tuple: (ticks, row) of the earliest landing, or None if the player
+        falls past every tile.
+    """
+    bottom = y + PLAYER_HEIGHT
+    rising = velocity + GRAVITY / 2 < 0
+    best = None
+
+    for i in range(len(entities)):
+        if (
+            entities.kind[i] == KIND_ENEMY
+            or x + PLAYER_WIDTH <= entities.x[i]
+            or x >= entities.x[i] + entities.width[i]
+            or (entities.y[i] < bottom and not rising)
+        ):
+            continue
+
+        ticks = ticks_to_cross(velocity, entities.y[i] - bottom)
+        if ticks is None:
+            continue
+        if best is None or ticks < best[0]:
+            best = (ticks, i)
+
+    return best
+
+
+def sweep_aabb(ax, ay, aw, ah, dx, dy, bx, by, bw, bh):
+    """
+    Sweeps box a by (dx, dy) against a static box b.
+
+    Args:
+        ax, ay, aw, ah (float): Start position and size of the moving box.
+        dx, dy (float): Displacement of the moving box over the tick.
+        bx, by, bw, bh (float): Position and size of the static box.
+
+    Returns:
+        tuple: (time, axis) where time is the fraction of the move at which
+        the boxes start to overlap (negative if they already overlap at the
+        start) and axis is "x" or "y" for the face they meet on, or None if
+        they do not overlap at any point of the move.
+    """
+    if dx > 0:
+        x_entry = (bx - ax - aw) / dx
+        x_exit = (bx + bw - ax) / dx
+    elif dx < 0:
+        x_entry = (bx + bw - ax) / dx
+        x_exit = (bx - ax - aw) / dx
+    elif ax + aw > bx and ax < bx + bw:
+        x_entry, x_exit = -math.inf, math.inf
+    else:
+        return None
+
+    if dy > 0:
+        y_entry = (by - ay - ah) / dy
+        y_exit = (by + bh - ay) / dy
+    elif dy < 0:
+        y_entry = (by + bh - ay) / dy
+        y_exit = (by - ay - ah) / dy
+    elif ay + ah > by and ay < by + bh:
+        y_entry, y_exit = -math.inf, math.inf
+    else:
+        return None
+
+    entry = max(x_entry, y_entry)
+    if entry >= min(x_exit, y_exit) or entry > 1 or min(x_exit, y_exit) <= 0:
+        return None
+
+    return entry, "y" if y_entry >= x_entry else "x"
+
+
+# Jump envelope: the bounces relative to the tiles for take-offs every
+# JUMP_ENVELOPE_STEP pixels down the screen, and for JUMP_ENVELOPE_SPEEDS
+# landing speeds where that matters, are combined into the lowest apex and
+# the earliest landing on each height any of them reach
+SCROLL_LINE = 244
+JUMP_ENVELOPE_STEP = 1
+JUMP_ENVELOPE_SPEEDS = 4
+
+# Ticks World.fast_forward stops short of a predicted landing, which covers
+# rounding in the closed form
+FAST_FORWARD_MARGIN = 3
+
+
+def compute_jump_tables():
+    """
+    Fills in the jump envelope from the current physics constants: the
+    height every take-off clears, in whole pixels, and for each whole rise
+    up to it the earliest tick any take-off lands on it. Rerun whenever
+    GRAVITY or JUMP_STRENGTH change.
+    """
+    global SAFE_JUMP_APEX, SAFE_LANDING_TICKS
+
+    arcs = []
+    for start_y, landed_y in takeoff_states():
+        arc = scrolled_arc(start_y, landed_y)
+        if arc is None:
+            raise ValueError("a bounce falls off the bottom of the screen")
+        arcs.append(arc)
+    apex = math.floor(min(-min(arc) for arc in arcs))
+
+    # The descent never scrolls, so past the apex each arc comes down onto
+    # the heights below it in order
+    ticks = [math.inf] * (apex + 1)
+    for arc in arcs:
+        rise = apex
+        for tick in range(arc.index(min(arc)) + 1, len(arc)):
+            while rise >= 0 and arc[tick] >= -rise:
+                ticks[rise] = min(ticks[rise], tick)
+                rise -= 1
+
+    SAFE_JUMP_APEX = apex
+    SAFE_LANDING_TICKS = tuple(ticks)
+
+
+compute_jump_tables()
+
+
+def physics():
+    """Returns the tunable physics constants, keyed as in CONFIG_FILE."""
+    return {key: globals()[name] for key, name in TUNABLE_CONSTANTS.items()}
+
+
+def apply_config(config):
+    """
+    Applies tuned physics constants and difficulty settings, as read from
+    CONFIG_FILE. Nothing is changed if any value is invalid.
+
+    Args:
+        config (dict): Any of the keys of TUNABLE_CONSTANTS, and a
+        "difficulty" dict overriding entries of DIFFICULTY.
+
+    Raises:
+        ValueError: If the config is invalid.
+    """
+    if not isinstance(config, dict):
+        raise ValueError("config must be an object")
+    constants = {}
+    for key, value in config.items():
+        if key == "difficulty":
+            continue
+        if key not in TUNABLE_CONSTANTS:
+            raise ValueError(f"unknown setting {key!r}")
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(f"{key} must be a number")
+        constants[TUNABLE_CONSTANTS[key]] = value
+
+    difficulty = config.get("difficulty", {})
+    if not isinstance(difficulty, dict):
+        raise ValueError("difficulty must be an object")
+    for key, value in difficulty.items():
+        if key not in DIFFICULTY:
+            raise ValueError(f"unknown difficulty setting {key!r}")
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(f"difficulty {key} must be a number")
+
+    # The bounce tables need a jump that goes up and comes back down
+    if constants.get("GRAVITY", GRAVITY) <= 0:
+        raise ValueError("gravity must be positive")
+    if constants.get("JUMP_STRENGTH", JUMP_STRENGTH) >= 0:
+        raise ValueError("jump_strength must be negative")
+    fps = constants.get("FPS", FPS)
+    if not isinstance(fps, int) or fps < 1:
+        raise ValueError("fps must be a whole number of milliseconds")
+
+    # The bounce tables take tens of milliseconds, a whole frame's budget
+    # several times over, so they are only rebuilt when the jump changed.
+    # Physics they can't be built for are put back.
+    previous = {name: globals()[name] for name in constants}
+    rebuild = any(
+        constants[name] != previous[name]
+        for name in ("GRAVITY", "JUMP_STRENGTH")
+        if name in constants
+    )
+    globals().update(constants)
+    if rebuild:
+        try:
+            compute_jump_tables()
+        except ValueError:
+            globals().update(previous)
+            compute_jump_tables()
+            raise
+    DIFFICULTY.update(difficulty)
+
+
+def load_config(path=CONFIG_FILE):
+    """
+    Applies a config file, if there is one.
+
+    Args:
+        path (str): Config file to read.
+
+    Raises:
+        ValueError: If the file isn't a valid config.
+    """
+    try:
+        f = open(path, "r")
+    except FileNotFoundError:
+        return
+    with f:
+        apply_config(json.load(f))
+
+
+def apply_tuning(world, config):
+    """
+    Applies a config reload recorded during a run, when replaying it: the
+    physics, which are shared by every World, and the run's difficulty.
+
+    Args:
+        world (World): The run being replayed.
+        config (dict): Config as stored by Recording.retune.
+    """
+    apply_config(config)
+    world.retune(config.get("difficulty", {}))
+
+
+class ConfigWatcher:
+    """
+    Watches the config file for changes by polling its modification time,
+    which costs one stat call per poll.
+    """
+
+    def __init__(self, path=CONFIG_FILE):
+        """
+        Creates a watcher. Nothing is read until the first poll.
+
+        Args:
+            path (str): Config file to watch.
+        """
+        self.path = path
+        self.mtime = None
+
+    def poll(self):
+        """
+        Applies the config file if it changed since the last poll.
+
+        Returns:
+            bool: Whether a new config was applied.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self.mtime:
+            return False
+        self.mtime = mtime
+
+        # A bad edit keeps the old settings until the file is fixed
+        try:
+            load_config(self.path)
+        except (OSError, ValueError) as error:
+            print(f"Config not applied: {error}")
+            return False
+        return True
+
+
+class InputState:
+    """
+    Key-state table filled in by Tk key events and sampled once per tick.
+
+    Key events only record which keys are down, so auto-repeat costs a dict
+    write instead of a canvas call, and the game loop turns the table into
+    a single action bitmask per tick that can be replayed deterministically.
+    """
+
+    __slots__ = ("held", "taps", "presses")
+
+    def __init__(self):
+        """Creates an empty key-state table."""
+        self.held = {}
+        self.taps = set()
+        self.presses = 0
+
+    def key_down(self, keysym):
+        """
+        Marks a key as held, remembering the order it was pressed in.
+
+        Args:
+            keysym (str): The key that was pressed.
+        """
+        if keysym not in self.held:
+            self.presses += 1
+            self.held[keysym] = self.presses
+
+    def key_up(self, keysym):
+        """
+        Marks a key as released.
+
+        Args:
+            keysym (str): The key that was released.
+        """
+        self.held.pop(keysym, None)
+
+    def tap(self, keysym):
+        """
+        Records a one-off key press to be reported by the next sample.
+
+        Args:
+            keysym (str): The key that was pressed.
+        """
+        self.taps.add(keysym)
+
+    def clear(self):
+        """Forgets every held key and pending tap."""
+        self.held.clear()
+        self.taps.clear()
+
+    def sample(self, left, right, jetpack, consume=True):
+        """
+        Returns the action bitmask for this tick and consumes pending taps.
+        When both directions are held the most recently pressed one wins.
+
+        Args:
+            left (str): Key bound to moving left.
+            right (str): Key bound to moving right.
+            jetpack (str): Key bound to toggling the jetpack.
+            consume (bool): False leaves the taps for other players'
+            samples this tick, the last sample must consume them.
+        """
+        left_at = self.held.get(left, 0)
+        right_at = self.held.get(right, 0)
+
+        action = 0
+        if left_at > right_at:
+            action = ACTION_LEFT
+        elif right_at > left_at:
+            action = ACTION_RIGHT
+
+        if jetpack in self.taps:
+            action |= ACTION_JETPACK
+        if consume:
+            self.taps.clear()
+
+        return action
+
+
+class Telemetry:
+    """
+    Gameplay event stream. Events are buffered in memory and a background
+    thread writes them to gzip-compressed JSONL files, starting a new file
+    once one holds `file_bytes` of events and deleting the oldest files
+    beyond `kept`.
+
+    `emit` never blocks the game: if the buffer is full because the writer
+    is stuck on a slow disk, new events are dropped and counted, and a
+    "dropped" event with the count is written once the writer catches up.
+    """
+
+    def __init__(
+        self,
+        directory=TELEMETRY_DIR,
+        capacity=TELEMETRY_CAPACITY,
+        interval=TELEMETRY_INTERVAL,
+        file_bytes=TELEMETRY_FILE_BYTES,
+        kept=TELEMETRY_KEPT,
+    ):
+        """
+        Starts the writer thread.
+
+        Args:
+            directory (str): Directory for the event files.
+            capacity (int): Events buffered before new ones are dropped.
+            interval (float): Seconds between flushes.
+            file_bytes (int): Uncompressed size at which files rotate.
+            kept (int): Number of event files kept, counting the one being
+            written, which is always kept.
+        """
+        self.directory = directory
+        self.capacity = capacity
+        self.interval = interval
+        self.file_bytes = file_bytes
+        self.kept = kept
+
+        # Ties together the events of one launch of the game
+        self.session = f"{os.getpid()}-{time.time_ns()}"
+
+        # Only the game thread appends and only the writer pops, both of
+        # which are atomic on a deque, so neither side takes a lock
+        self.buffer = deque()
+        self.dropped = 0
+        self.reported = 0
+        self.failed = 0
+
+        self.file = None
+        self.written = 0
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name="telemetry", daemon=True
+        )
+        self.thread.start()
+
+    def emit(self, event, **fields):
+        """
+        Buffers an event.
+
+        Args:
+            event (str): Kind of event, such as "landing".
+            **fields: JSON-friendly details of the event.
+        """
+        if len(self.buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        fields["event"] = event
+        fields["time"] = round(time.time(), 3)
+        self.buffer.append(fields)
+
+    def run(self):
+        """Writer thread, flushes every `interval` seconds until closed."""
+        while not self.stopping.wait(self.interval):
+            self.flush()
+        self.flush()
+        self.close_file()
+
+    def flush(self):
+        """Writes out the buffered events. Only the writer thread calls it."""
+        buffer = self.buffer
+        lines = []
+        for _ in range(len(buffer)):
+            event = buffer.popleft()
+            event["session"] = self.session
+            lines.append(json.dumps(event))
+
+        dropped = self.dropped
+        if dropped > self.reported:
+            lines.append(
+                json.dumps(
+                    {
+                        "event": "dropped",
+                        "count": dropped - self.reported,
+                        "time": round(time.time(), 3),
+                        "session": self.session,
+                    }
+                )
+            )
+            self.reported = dropped
+
+        if not lines:
+            return
+
+        data = ("\n".join(lines) + "\n").encode()
+        try:
+            if self.file is None or self.written >= self.file_bytes:
+                self.rotate()
+            self.file.write(data)
+            # A sync flush keeps the file readable up to here if we crash
+            self.file.flush()
+            self.written += len(data)
+        except OSError as error:
+            # Losing telemetry must never take the game down with it
+            self.failed += len(lines)
+            print(f"Telemetry write failed: {error}")
+            self.close_file()
+
+    def close_file(self):
+        """
+        Closes the current event file, if any, so the next flush starts a
+        new one. A file that fails to close is given up on.
+        """
+        file, self.file = self.file, None
+        if file is not None:
+            try:
+                file.close()
+            except OSError as error:
+                print(f"Telemetry file not closed cleanly: {error}")
+
+    def rotate(self):
+        """Starts a new event file and deletes the oldest ones."""
+        self.close_file()
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory, f"events-{time.time_ns()}.jsonl.gz"
+        )
+        self.file = gzip.open(path, "wb")
+        self.written = 0
+
+        # Names sort by creation time, oldest first. The file just opened
+        # is always kept, even with `kept` at 0, where files[:-0] would
+        # delete nothing at all
+        files = sorted(
+            name
+            for name in os.listdir(self.directory)
+            if name.startswith("events-")
+        )
+        for name in files[: max(len(files) - max(self.kept, 1), 0)]:
+            os.remove(os.path.join(self.directory, name))
+
+    def close(self):
+        """Flushes the remaining events and stops the writer thread."""
+        self.stopping.set()
+        self.thread.join()
+
+
+class World:
+    """
+    World holds the state and rules of a single run, with no Tk in sight.
+
+    It owns the player, the tiles and enemies and the difficulty ramp, and
+    advances them one tick at a time from an action bitmask. RoboJump drives
+    a World and draws it; headless code such as the training environment
+    can run one directly, and a seed makes a run repeatable.
+    """
+
+    def __init__(self, seed=None, difficulty=None):
+        """
+        Creates a world ready to play.
+
+        Args:
+            seed: Seed for the level generator, None for a random one.
+            difficulty (dict): Overrides for entries of DIFFICULTY.
+        """
+        self.difficulty = dict(DIFFICULTY)
+        if difficulty:
+            self.difficulty.update(difficulty)
+
+        self.random = random.Random(seed)
+        self.generate = True
+        self.telemetry = None
+        self.entities = Entities()
+        self.removed_items = []
+        self.reset()
+
+    def reset(self, seed=None):
+        """
+        Puts the player back at the start of a fresh level.
+
+        Args:
+            seed: Reseeds the level generator when given.
+        """
+        if seed is not None:
+            self.random.seed(seed)
+
+        self.player_x_pos = START_X
+        self.player_y_pos = START_Y
+        self.player_y_velocity = -JUMP_STRENGTH
+        self.player_x_velocity = 0
+        self.prev_player_y_pos = START_Y
+        self.scroll_distance = 0
+        self.facing_left = False
+
+        self.score = 0
+        self.score_gained = 0
+        self.ticks = 0
+        self.game_over = False
+        self.death_cause = None
+
+        self.player_heights = []
+        self.is_jetpack_on = False  # Jetpack is off initially
+        self.is_power_up_on = False  # Power-ups are not active
+
+        # Latest tiles a jump can start from as (x, y - scrolled), which
+        # scrolling doesn't change. Patrolled tiles don't count.
+        self.scrolled = 0
+        self.recent_tiles = deque(maxlen=RECENT_TILES)
+        self.last_spawn_enemy = False
+
+        self.tile_y_pos = 70
+        self.enemy_chance = self.difficulty["enemy_chance"]
+        self.space_between = self.difficulty["space_between"]
+        self.difficulty_level = self.difficulty["level_step"]
+
+        self.entities.clear()
+        self.add_initial_tiles()
+
+    def retune(self, difficulty):
+        """
+        Applies new difficulty settings to the current run. The ramp
+        carries on from where it was, moved by as much as its base moved.
+
+        Args:
+            difficulty (dict): Overrides for entries of the difficulty.
+        """
+        previous = self.difficulty
+        self.difficulty = {**previous, **difficulty}
+        self.enemy_chance += (
+            self.difficulty["enemy_chance"] - previous["enemy_chance"]
+        )
+        self.space_between += (
+            self.difficulty["space_between"] - previous["space_between"]
+        )
+
+    def clone(self, margin=None):
+        """
+        Returns a copy of the world for looking ahead. The copy never
+        generates new tiles, so stepping it leaves this world's random
+        sequence untouched.
+
+        Args:
+            margin (float): Only copy entities at most this far above or
+            below the screen, all of them if None.
+        """
+        copy = World.__new__(World)
+        copy.__dict__.update(self.__dict__)
+        copy.generate = False
+        copy.telemetry = None
+        copy.removed_items = []
+        copy.player_heights = self.player_heights[-2:]
+
+        if margin is None:
+            copy.entities = self.entities.copy()
+        else:
+            copy.entities = self.entities.copy(-margin, HEIGHT + margin)
+        return copy
+
+    def snapshot(self):
+        """
+        Returns a full copy of the world, generator state included, that
+        carries on exactly as this world would when stepped.
+        """
+        copy = self.clone()
+        copy.generate = self.generate
+        copy.random = random.Random()
+        copy.random.setstate(self.random.getstate())
+        copy.player_heights = list(self.player_heights)
+        copy.recent_tiles = deque(self.recent_tiles, RECENT_TILES)
+        return copy
+
+    def state(self):
+        """Returns the saveable part of the world as a dictionary."""
+        entities = self.entities
+        return {
+            "player_x_pos": self.player_x_pos,
+            "player_y_pos": self.player_y_pos,
+            "player_y_velocity": self.player_y_velocity,
+            "player_x_velocity": self.player_x_velocity,
+            "score": self.score,
+            "player_heights": self.player_heights,
+            "is_jetpack_on": self.is_jetpack_on,
+            "is_power_up_on": self.is_power_up_on,
+            "tile_y_pos": self.tile_y_pos,
+            "space_between": self.space_between,
+            "enemy_chance": self.enemy_chance,
+            "difficulty_level": self.difficulty_level,
+            "level": {
+                "entities": [
+                    [
+                        entities.kind[i],
+                        entities.x[i],
+                        entities.y[i],
+                        entities.x_velocity[i],
+                        entities.behaviour[i],
+                        entities.state[i],
+                    ]
+                    for i in range(len(entities))
+                ],
+                "recent_tiles": list(self.recent_tiles),
+                "scrolled": self.scrolled,
+                "last_spawn_enemy": self.last_spawn_enemy,
+            },
+        }
+
+    def load(self, state):
+        """
+        Restores a world saved with `state`, tiles and enemies included.
+        Saves from before the level was kept get fresh tiles laid out
+        around the restored player.
+
+        Args:
+            state (dict): Saved world state.
+        """
+        self.reset()
+        for key, value in self.state().items():
+            if key != "level":
+                setattr(self, key, state.get(key, value))
+        self.prev_player_y_pos = self.player_y_pos
+
+        self.entities.clear()
+        level = state.get("level")
+        if level is None:
+            self.add_initial_tiles()
+            return
+
+        self.scrolled = level["scrolled"]
+        self.last_spawn_enemy = level["last_spawn_enemy"]
+        self.recent_tiles.clear()
+        self.recent_tiles.extend(tuple(tile) for tile in level["recent_tiles"])
+        for kind, x, y, x_velocity, behaviour, entity_state in level[
+            "entities"
+        ]:
+            self.entities.add(
+                kind, x, y, x_velocity, behaviour=behaviour, state=entity_state
+            )
+
+    def step(self, action):
+        """
+        Advances the world by one tick.
+
+        Args:
+            action (int): Bitmask of ACTION_* flags for this tick.
+
+        Returns:
+            float: Score gained during the tick.
+        """
+        self.score_gained = 0
+        self.ticks += 1
+        self.apply_input(action)
+
+        # Remember where the player started the tick for swept collisions
+        self.prev_player_y_pos = self.player_y_pos
+        self.scroll_distance = 0
+
+        # Apply gravity to the player's vertical velocity
+        self.player_y_velocity += GRAVITY
+
+        # Handle jetpack activation
+        if self.is_jetpack_on:
+            self.player_y_pos -= JETPACK_STRENGTH + 10  # Jetpack movement
+            self.player_y_velocity = (
+                -15
+            )  # Override vertical velocity when jetpack is on
+        else:
+            # Apply gravity if the jetpack is not on
+            self.player_y_pos += self.player_y_velocity
+
+        # Update the player's horizontal position
+        self.player_x_pos += self.player_x_velocity
+
+        # Check and handle player's horizontal and vertical bounds
+        self.check_horizontal_bound()
+        self.check_vertical_bound()
+        if self.game_over:
+            return self.score_gained
+
+        # Move objects and enemies
+        self.move_objects()
+        self.move_enemy()
+
+        # Check for collisions
+        self.check_collision()
+
+        return self.score_gained
+
+    def fast_forward(self, limit):
+        """
+        Advances the world through up to `limit` idle ticks in one go,
+        ending up exactly as that many calls of step(0) would. Only ticks
+        where nothing can happen are skipped: the player is in free flight
+        without scrolling, no enemy is moving and no tile is in the way.
+        The first possible landing comes from next_landing in closed form,
+        so only the player's height is updated per tick.
+
+        Args:
+            limit (int): Most ticks to advance.
+
+        Returns:
+            int: Number of ticks advanced, 0 if the next tick needs step.
+        """
+        if (
+            self.game_over
+            or self.is_jetpack_on
+            or self.is_power_up_on
+            or not 0 < self.player_x_pos < WIDTH
+            or self.player_y_pos < 0
+        ):
+            return 0
+
+        # Moving enemies, and entities that step would remove, need step
+        entities = self.entities
+        for i in range(len(entities)):
+            if entities.y[i] >= HEIGHT or (
+                entities.kind[i] == KIND_ENEMY
+                and entities.y[i] > -entities.height[i]
+            ):
+                return 0
+
+        # Stop short of the first possible landing. Raising the player by
+        # half a tick of gravity makes the estimate err on the early side
+        landing = next_landing(
+            self.player_x_pos,
+            self.player_y_pos - GRAVITY / 2,
+            self.player_y_velocity,
+            entities,
+        )
+        if landing is not None:
+            limit = min(limit, landing[0] - FAST_FORWARD_MARGIN)
+
+        # Same arithmetic as step, stopping before a tick that falls off
+        # the bottom or scrolls
+        y = self.player_y_pos
+        velocity = self.player_y_velocity
+        previous = self.prev_player_y_pos
+        heights = list(self.player_heights)
+        ticks = 0
+        while ticks < limit:
+            next_velocity = velocity + GRAVITY
+            next_y = y + next_velocity
+            if next_y >= HEIGHT or (
+                next_y <= SCROLL_LINE and next_velocity <= 0
+            ):
+                break
+            previous, y, velocity = y, next_y, next_velocity
+            heights.append(y)
+            ticks += 1
+
+        if ticks:
+            self.ticks += ticks
+            self.score_gained = 0
+            self.scroll_distance = 0
+            self.player_x_velocity = 0
+            self.prev_player_y_pos = previous
+            self.player_y_pos = y
+            self.player_y_velocity = velocity
+            self.player_heights = heights[-5:]
+        return ticks
+
+    def replay(self, actions):
+        """
+        Steps the world through recorded actions, one per tick, skipping
+        runs of idle ticks with fast_forward where it can. Stops early if
+        the run ends.
+
+        Args:
+            actions (bytes): Action of each tick.
+        """
+        for action, run in itertools.groupby(actions):
+            ticks = sum(1 for _ in run)
+            while ticks and not self.game_over:
+                skipped = self.fast_forward(ticks) if action == 0 else 0
+                if not skipped:
+                    self.step(action)
+                    skipped = 1
+                ticks -= skipped
+            if self.game_over:
+                return
+
+    def end(self, cause):
+        """
+        Ends the run.
+
+        Args:
+            cause (str): What killed the player, "fall" or "enemy".
+        """
+        self.game_over = True
+        self.death_cause = cause
+        self.emit("run_end", cause=cause, score=self.score)
+
+    def emit(self, event, **fields):
+        """
+        Sends a telemetry event tagged with the tick and the player's
+        position, if the world has a Telemetry attached.
+
+        Args:
+            event (str): Kind of event.
+            **fields: JSON-friendly details of the event.
+        """
+        if self.telemetry is None:
+            return
+        self.telemetry.emit(
+            event,
+            tick=self.ticks,
+            x=round(self.player_x_pos),
+            altitude=round(self.altitude()),
+            **fields,
+        )
+
+    def altitude(self):
+        """Returns the player's height above the bottom of the first screen."""
+        return self.scrolled + HEIGHT - self.player_y_pos
+
+    def apply_input(self, action):
+        """
+        Applies one tick of sampled input to the player.
+
+        Args:
+            action (int): Bitmask of ACTION_* flags for this tick.
+        """
+        if action & ACTION_LEFT:
+            self.player_x_velocity = -HORIZONTAL_STRENGTH
+            self.facing_left = True
+        elif action & ACTION_RIGHT:
+            self.player_x_velocity = HORIZONTAL_STRENGTH
+            self.facing_left = False
+        else:
+            self.player_x_velocity = 0
+
+        if action & ACTION_JETPACK:
+            self.deploy_jet_pack()
+
+    def deploy_jet_pack(self):
+        """Toggles the jetpack and power-up states."""
+        self.is_jetpack_on = not self.is_jetpack_on
+        self.is_power_up_on = not self.is_power_up_on
+        self.emit("jetpack", on=self.is_jetpack_on)
+
+    def check_horizontal_bound(self):
+        """
+        checks if the player goes beyond the screen horizontally
+        Moves the position of the player to create a teleportation effect
+        """
+        if self.player_x_pos >= WIDTH:
+            self.player_x_pos = 1
+        elif self.player_x_pos <= 0:
+            self.player_x_pos = WIDTH - 1
+
+    def check_vertical_bound(self):
+        """
+        checks if the player has fallen of the bottom
+        to end the game
+        """
+        if self.player_y_pos >= HEIGHT:  # if player falls of the bottom
+            self.end("fall")
+
+    def check_collision(self):
+        """
+        Checks for collisions between the player and tiles.
+        If the jetpack is off,the player will collide with enemies or tiles.
+        Removes tiles that fall off the screen.
+
+        Collisions are swept over the whole tick: the player's movement
+        relative to each entity is tested from where both started the tick,
+        so fast falls, jetpack climbs and scrolling can't skip past a tile
+        or an enemy between two frames.
+        """
+        entities = self.entities
+        xs = entities.x
+        ys = entities.y
+        kinds = entities.kind
+        widths = entities.width
+        heights = entities.height
+        x_velocities = entities.x_velocity
+        y_velocities = entities.y_velocity
+        check = not self.is_jetpack_on
+        scroll = self.scroll_distance
+
+        # Player movement this tick, undoing any horizontal wrap-around
+        dx = self.player_x_velocity
+        dy = self.player_y_pos - self.prev_player_y_pos
+        start_x = self.player_x_pos - dx
+        start_y = self.prev_player_y_pos
+
+        # Walk backwards so removed rows never skip an unvisited entity
+        for i in range(len(entities) - 1, -1, -1):
+            tile_x = xs[i]
+            tile_y = ys[i]
+
+            if check:
+                # Entity movement this tick, matching move_enemy
+                tile_dx = 0
+                tile_dy = 0
+                height = heights[i]
+                if kinds[i] == KIND_ENEMY and -height < tile_y < HEIGHT:
+                    tile_dx = x_velocities[i]
+                    tile_dy = y_velocities[i]
+
+                # Sweep the player relative to the entity's starting box,
+                # skipping entities out of its reach this tick, vertically
+                # and then horizontally
+                move_y = dy - scroll - tile_dy
+                box_y = tile_y - scroll - tile_dy
+                if move_y > 0:
+                    reach_top = start_y
+                    reach_bottom = start_y + PLAYER_HEIGHT + move_y
+                else:
+                    reach_top = start_y + move_y
+                    reach_bottom = start_y + PLAYER_HEIGHT
+                hit = None
+                if box_y <= reach_bottom and box_y + height >= reach_top:
+                    move_x = dx - tile_dx
+                    box_x = tile_x - tile_dx
+                    width = widths[i]
+                    if move_x > 0:
+                        reach_left = start_x
+                        reach_right = start_x + PLAYER_WIDTH + move_x
+                    else:
+                        reach_left = start_x + move_x
+                        reach_right = start_x + PLAYER_WIDTH
+                    if box_x <= reach_right and box_x + width >= reach_left:
+                        hit = sweep_aabb(
+                            start_x,
+                            start_y,
+                            PLAYER_WIDTH,
+                            PLAYER_HEIGHT,
+                            move_x,
+                            move_y,
+                            box_x,
+                            box_y,
+                            width,
+                            height,
+                        )
+
+                if kinds[i] == KIND_ENEMY:
+                    if hit is not None:
+                        self.emit("enemy_collision")
+                        self.end("enemy")
+                        return
+
+                elif (
+                    hit is not None
+                    # player was at or above the tile's top
+                    and hit[0] >= 0
+                    # player came down onto the tile's top face
+                    and hit[1] == "y"
+                    and dy - scroll > 0
+                ):
+                    # Stand the player on the tile and bounce
+                    self.player_y_pos = tile_y - PLAYER_HEIGHT
+                    self.player_y_velocity = JUMP_STRENGTH
+                    self.emit("landing", score=self.score)
+
+            # Remove tiles that fall beyond the height limit
+            if tile_y >= HEIGHT:
+                if entities.items[i]:
+                    self.removed_items.append(entities.items[i])
+                entities.remove(i)
+
+    def move_objects(self):
+        """
+        Moves objects (tiles, player, etc.) based on the player's movement.
+        Adjusts tiles and adds score when the player moves above certain
+        height all objects will move down to
+        replicate a scrolling effect
+        """
+        self.player_heights.append(self.player_y_pos)
+        value = SCROLL_LINE  # Player height limit
+
+        # player is visually above the threshold and falling or using jetpack
+        if self.player_y_pos <= value and (
+            self.player_y_velocity <= 0 or self.is_power_up_on
+        ):
+            # Calculate the distance moved to replicate player falling
+            higher_height = self.player_heights[-1]
+            lower_height = self.player_heights[-2]
+            distance = -higher_height + lower_height
+
+            # Add the distance to the score and add new tiles
+            self.add_score(distance)
+            if self.generate:
+                self.add_tiles()
+
+            # Move all objects (tiles) by the calculated distance
+            self.scroll_distance = distance * 1.6
+            self.scrolled += self.scroll_distance
+            entities = self.entities
+            for i in range(len(entities)):
+                entities.y[i] += self.scroll_distance
+
+            # Adjust the player's vertical position by the distance moved
+            self.player_y_pos += distance * 2
+
+        # Keep track of only the last 5 player heights to avoid memory bloat
+        self.player_heights = self.player_heights[-5:]
+
+    def add_tiles(self):
+        """
+        Adds new tiles or enemies to the game based on the current
+        score and difficulty.The space between tiles increases as
+        the player's score rises. The function spawns either an enemy
+        or a regular tile, and ensures no collisions with existing tiles.
+        """
+        # Increase space between tiles and raise difficulty based on score
+        if self.score > self.difficulty_level:
+            self.space_between += self.difficulty["space_step"]
+            self.enemy_chance += self.difficulty["enemy_step"]
+            self.difficulty_level += self.difficulty["level_step"]
+            self.emit(
+                "difficulty",
+                space_between=self.space_between,
+                enemy_chance=self.enemy_chance,
+                score=self.score,
+            )
+
+        y = (
+            self.tile_y_pos - self.space_between
+        )  # Vertical position adjusted for space
+
+        # Randomly choose between spawning an enemy or a regular tile,
+        # never two enemies in a row so they can't wall off the climb
+        spawn_choice = self.random.random()
+        if spawn_choice < self.enemy_chance and not self.last_spawn_enemy:
+            y = self.spawn_enemy(y)
+            self.last_spawn_enemy = True
+        else:
+            x, y = self.reachable_spot(y)
+            self.spawn_entity(KIND_TILE, x, y)
+            self.last_spawn_enemy = False
+
+        # Update the vertical position for the next tile spawn
+        self.tile_y_pos = y
+
+    def reachable_spot(self, y):
+        """
+        Picks where to put a new tile at height `y` so that a jump from at
+        least one of the latest tiles can land on it. The tile is lowered
+        if it is out of jumping range, and random x positions are tried
+        before falling back to one straight above the highest tile.
+
+        Args:
+            y (float): Wanted top edge of the tile, on screen.
+
+        Returns:
+            tuple: (x, y) of the tile on screen.
+        """
+        if not self.recent_tiles:
+            return self.random.randint(0, 380), y
+
+        # Work relative to the tiles so scrolling doesn't matter
+        top_x, top_y = min(self.recent_tiles, key=lambda tile: tile[1])
+        tile_y = max(y - self.scrolled, top_y - SAFE_JUMP_APEX)
+
+        for _ in range(GENERATION_TRIES):
+            x = self.random.randint(0, 380)
+            for from_x, from_y in self.recent_tiles:
+                if is_reachable(from_x, from_y, x, tile_y):
+                    return x, tile_y + self.scrolled
+
+        return top_x, tile_y + self.scrolled
+
+    def add_score(self, additional_score):
+        """
+        Adds to the player's score based on their movement or height change.
+
+        Args:
+            additional_score (int or float): Amount to increase the score by.
+        """
+        self.score += additional_score
+        self.score_gained += additional_score
+
+    def spawn_enemy(self, y):
+        """
+        Spawns an enemy with a behaviour picked from those the score has
+        unlocked. Patrollers walk the latest tile instead of taking a row of
+        their own, and that tile stops counting as a place to jump from, so
+        the next tiles are reachable without it.
+
+        Args:
+            y (float): Top edge of the row for the enemy, on screen.
+
+        Returns:
+            float: Top edge of the row the next spawn goes above.
+        """
+        unlocked = [
+            index
+            for index, params in enumerate(ENEMY_BEHAVIOURS)
+            if self.score >= params["from_score"]
+        ]
+        # Only draw a random number when there is a choice, so levels
+        # below the first unlock play out as they always have
+        behaviour = unlocked[0]
+        if len(unlocked) > 1:
+            behaviour = self.random.choices(
+                unlocked,
+                [ENEMY_BEHAVIOURS[index]["weight"] for index in unlocked],
+            )[0]
+        speed = ENEMY_BEHAVIOURS[behaviour]["speed"]
+
+        if behaviour == BEHAVIOUR_PATROL:
+            tile_x, tile_y = self.recent_tiles.pop()
+            self.spawn_entity(
+                KIND_ENEMY,
+                tile_x,
+                tile_y + self.scrolled - KIND_SIZES[KIND_ENEMY][1],
+                speed,
+                behaviour,
+                state=tile_x,
+            )
+            return self.tile_y_pos
+
+        x = self.random.randint(
+            0, 380
+        )  # Random horizontal position within the canvas width
+        if behaviour == BEHAVIOUR_CHASE:
+            speed = 0
+        self.spawn_entity(KIND_ENEMY, x, y, speed, behaviour)
+        return y
+
+    def move_enemy(self):
+        """
+        Moves the enemies in the visible rows, one pass per behaviour over
+        the rows of all its enemies. Enemies above or below the visible
+        rows are not animated.
+        """
+        entities = self.entities
+        kind = entities.kind
+        y = entities.y
+        height = entities.height
+        behaviour = entities.behaviour
+
+        groups = [[] for _ in ENEMY_BEHAVIOURS]
+        for i in range(len(kind)):
+            if kind[i] == KIND_ENEMY and -height[i] < y[i] < HEIGHT:
+                groups[behaviour[i]].append(i)
+
+        for params, rows in zip(ENEMY_BEHAVIOURS, groups):
+            if rows:
+                getattr(self, params["move"])(rows, params)
+
+    def move_drifters(self, rows, params):
+        """
+        Moves drifters right at their speed. A drifter that goes off the
+        right side of the screen comes back in on the left.
+
+        Args:
+            rows (list): Rows of the enemies to move.
+            params (dict): The behaviour's ENEMY_BEHAVIOURS entry.
+        """
+        x = self.entities.x
+        x_velocity = self.entities.x_velocity
+        for i in rows:
+            if x[i] > WIDTH:
+                x[i] = -PLAYER_WIDTH
+            else:
+                x[i] += x_velocity[i]
+
+    def move_flyers(self, rows, params):
+        """
+        Moves flyers like drifters while they bob up and down on a sine
+        wave. Their state is the tick of the wave they are at.
+
+        Args:
+            rows (list): Rows of the enemies to move.
+            params (dict): The behaviour's ENEMY_BEHAVIOURS entry.
+        """
+        self.move_drifters(rows, params)
+
+        y = self.entities.y
+        y_velocity = self.entities.y_velocity
+        state = self.entities.state
+        amplitude = params["amplitude"]
+        period = params["period"]
+        step = 2 * math.pi / period
+        for i in rows:
+            tick = state[i]
+            dy = amplitude * (
+                math.sin((tick + 1) * step) - math.sin(tick * step)
+            )
+            y[i] += dy
+            y_velocity[i] = dy
+            state[i] = (tick + 1) % period
+
+    def move_chasers(self, rows, params):
+        """
+        Moves chasers towards the player's x position, no faster than
+        their speed.
+
+        Args:
+            rows (list): Rows of the enemies to move.
+            params (dict): The behaviour's ENEMY_BEHAVIOURS entry.
+        """
+        x = self.entities.x
+        x_velocity = self.entities.x_velocity
+        speed = params["speed"]
+        target = self.player_x_pos
+        for i in rows:
+            dx = min(max(target - x[i], -speed), speed)
+            x[i] += dx
+            x_velocity[i] = dx
+
+    def move_patrollers(self, rows, params):
+        """
+        Walks patrollers back and forth along their tile. Their state is
+        the tile's left edge.
+
+        Args:
+            rows (list): Rows of the enemies to move.
+            params (dict): The behaviour's ENEMY_BEHAVIOURS entry.
+        """
+        x = self.entities.x
+        x_velocity = self.entities.x_velocity
+        state = self.entities.state
+        span = TILE_WIDTH - KIND_SIZES[KIND_ENEMY][0]
+        for i in rows:
+            left = state[i]
+            new_x = x[i] + x_velocity[i]
+            if not left <= new_x <= left + span:
+                # Turn round at the ends of the tile
+                x_velocity[i] = -x_velocity[i]
+                new_x = x[i] + x_velocity[i]
+            x[i] = new_x
+
+    def spawn_entity(self, kind, x, y, x_velocity=0, behaviour=0, state=0):
+        """
+        Adds an entity to the store. Its canvas item is only created
+        by `TkRenderer.draw_entities` once it scrolls into view.
+
+        Args:
+            kind (int): One of the KIND_* constants.
+            x (float): Left edge of the entity.
+            y (float): Top edge of the entity.
+            x_velocity (float): Horizontal speed per tick.
+            behaviour (int): Index into ENEMY_BEHAVIOURS, for enemies.
+            state (float): Starting state of the behaviour.
+        """
+        if kind == KIND_TILE:
+            self.recent_tiles.append((x, y - self.scrolled))
+        return self.entities.add(
+            kind, x, y, x_velocity, behaviour=behaviour, state=state
+        )
+
+    def add_initial_tiles(self):
+        """
+        Adds the initial set of tiles to the level in specific positions.
+        The tiles are placed in a grid-like pattern around the player's
+        initial position.
+        """
+        self.spawn_entity(
+            KIND_TILE,
+            self.player_x_pos,
+            self.player_y_pos + PLAYER_HEIGHT + TILE_HEIGHT,
+        )
+
+        quadrant_width = WIDTH // 2
+        quadrant_height = HEIGHT // 2
+
+        positions = (
+            # x = 240 // 3 = 80, y = 320 // 3 = 106
+            (quadrant_width // 3, quadrant_height // 3),
+            # x = 240 // 3 * 2 = 160, y = 320 // 3 * 2 = 213
+            (quadrant_width // 3 * 2, quadrant_height // 3 * 2),
+            # x = 360 + 240 // 3 = 400, y = 106
+            (quadrant_width + quadrant_width // 3, quadrant_height // 3),
+            # x = 360 + 240 // 3 * 2 = 480, y = 213
+            (
+                quadrant_width + quadrant_width // 3 * 2,
+                quadrant_height // 3 * 2,
+            ),
+            # x = 80, y = 480 + 106 = 586
+            (quadrant_width // 3, quadrant_height + quadrant_height // 3),
+            # x = 160, y = 480 + 213 = 693
+            (
+                quadrant_width // 3 * 2,
+                quadrant_height + quadrant_height // 3 * 2,
+            ),
+            # x = 400, y = 586
+            (
+                quadrant_width + quadrant_width // 3,
+                quadrant_height + quadrant_height // 3,
+            ),
+            # x = 480, y = 693
+            (
+                quadrant_width + quadrant_width // 3 * 2,
+                quadrant_height + quadrant_height // 3 * 2,
+            ),
+        )
+        for x, y in positions:
+            self.spawn_entity(KIND_TILE, x, y)
+
+
+class Recording:
+    """
+    Recording of a run as its seed, difficulty, physics and the action of
+    every tick, which is all it takes to replay the run exactly. Config
+    reloads during the run are kept with the tick they were applied on.
+
+    Saved as JSON with the actions run-length encoded as
+    [action, ticks] pairs, since keys are held for many ticks at a time.
+    """
+
+    def __init__(self, seed, difficulty=None, actions=b"", tunings=None):
+        """
+        Starts a recording.
+
+        Args:
+            seed (int): Seed the run's World was reset with.
+            difficulty (dict): Difficulty overrides the World was made with.
+            actions (bytes): Actions of the ticks played so far.
+            tunings (dict): Config applied before each tick it's keyed by,
+            the current physics at tick 0 if None.
+        """
+        self.seed = seed
+        self.difficulty = dict(difficulty or {})
+        self.actions = bytearray(actions)
+        self.tunings = dict(tunings or {0: physics()})
+        self.name = None
+        self.score = None
+
+    def add(self, action):
+        """Records the action of one tick."""
+        self.actions.append(action)
+
+    def retune(self, config):
+        """
+        Records a config reload, applied before the next tick.
+
+        Args:
+            config (dict): The physics and difficulty now in effect.
+        """
+        self.tunings[len(self.actions)] = config
+
+    def world(self):
+        """
+        Returns a World at the start of the recorded run, with the physics
+        it started under applied.
+        """
+        apply_config(self.tunings.get(0, {}))
+        return World(self.seed, self.difficulty)
+
+    def replay(self, world, stop):
+        """
+        Replays the recorded actions on a World from its current tick up
+        to tick `stop`, applying each config reload on its tick.
+
+        Args:
+            world (World): The run, as returned by `world` or a snapshot.
+            stop (int): Tick to stop at.
+        """
+        stop = min(stop, len(self.actions))
+        while world.ticks < stop and not world.game_over:
+            config = self.tunings.get(world.ticks)
+            if config is not None:
+                apply_tuning(world, config)
+            end = min(
+                (tick for tick in self.tunings if world.ticks < tick < stop),
+                default=stop,
+            )
+            world.replay(self.actions[world.ticks: end])
+
+    def save(self, path):
+        """
+        Writes the recording to a JSON file.
+
+        Args:
+            path (str): File to write.
+        """
+        runs = []
+        for action in self.actions:
+            if runs and runs[-1][0] == action:
+                runs[-1][1] += 1
+            else:
+                runs.append([action, 1])
+
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "seed": self.seed,
+                    "difficulty": self.difficulty,
+                    "tunings": sorted(self.tunings.items()),
+                    "name": self.name,
+                    "score": self.score,
+                    "actions": runs,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a recording written by `save`.
+
+        Args:
+            path (str): File to read.
+
+        Returns:
+            Recording: The loaded recording.
+        """
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        actions = bytearray()
+        for action, ticks in data["actions"]:
+            actions += bytes((action,)) * ticks
+
+        # Recordings from before tunings were kept replay under the
+        # current physics
+        tunings = data.get("tunings")
+        recording = cls(
+            data["seed"],
+            data["difficulty"],
+            actions,
+            tunings and {tick: config for tick, config in tunings},
+        )
+        recording.name = data.get("name")
+        recording.score = data.get("score")
+        return recording
+
+
+class Trace:
+    """
+    Per-tick position trace of a run, which a Ghost replays without
+    simulating anything. Positions are stored as int16 differences from
+    the tick before, four bytes a tick.
+    """
+
+    def __init__(self, world):
+        """
+        Starts a trace at the world's current position.
+
+        Args:
+            world (World): The run being traced.
+        """
+        self.x = self.start_x = round(world.player_x_pos)
+        self.altitude = self.start_altitude = round(world.altitude())
+        self.steps = array("h")
+
+    def add(self, world):
+        """Records the position at the end of a tick."""
+        # Differences that don't fit an int16 catch up over later ticks
+        dx = min(max(round(world.player_x_pos) - self.x, -32768), 32767)
+        da = min(max(round(world.altitude()) - self.altitude, -32768), 32767)
+        self.x += dx
+        self.altitude += da
+        self.steps.append(dx)
+        self.steps.append(da)
+
+    def save(self, path, name, score):
+        """
+        Writes the trace to a file Ghost can map.
+
+        Args:
+            path (str): File to write.
+            name (str): Player's name, shown with the ghost.
+            score (float): Final score of the run.
+        """
+        name = name.encode()[:255]
+        steps = array("h", self.steps)
+        if sys.byteorder == "big":
+            steps.byteswap()
+
+        with open(path, "wb") as f:
+            f.write(
+                TRACE_HEADER.pack(
+                    TRACE_MAGIC,
+                    len(steps) // 2,
+                    self.start_x,
+                    self.start_altitude,
+                    score,
+                    len(name),
+                )
+            )
+            f.write(name)
+            f.write(steps.tobytes())
+
+
+class Ghost:
+    """
+    Replays a saved Trace one tick at a time. The file is memory-mapped
+    and read a step at a time, so even long runs load instantly and only
+    the pages actually replayed are ever read in.
+    """
+
+    def __init__(self, path):
+        """
+        Maps a trace file.
+
+        Args:
+            path (str): File written by Trace.save.
+
+        Raises:
+            ValueError: If the file isn't a trace.
+        """
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, ticks, x, altitude, score, length = (
+                TRACE_HEADER.unpack_from(self.data)
+            )
+        except struct.error:
+            magic = None
+        if magic != TRACE_MAGIC:
+            self.data.close()
+            raise ValueError(f"{path} is not a trace")
+
+        start = TRACE_HEADER.size
+        self.name = self.data[start : start + length].decode(errors="replace")
+        self.score = score
+        self.ticks = ticks
+        self.offset = start + length
+        self.x = x
+        self.altitude = altitude
+        self.tick = 0
+        self.item = None
+
+    def step(self):
+        """
+        Moves the ghost on by one tick.
+
+        Returns:
+            bool: False once the traced run is over.
+        """
+        if self.tick >= self.ticks:
+            return False
+        dx, da = TRACE_STEP.unpack_from(self.data, self.offset)
+        self.offset += TRACE_STEP.size
+        self.x += dx
+        self.altitude += da
+        self.tick += 1
+        return True
+
+    def close(self):
+        """Unmaps the trace file."""
+        self.data.close()
+
+
+class Autopilot:
+    """
+    Search-based autopilot that picks the player's input every tick.
+
+    It runs a beam search over inputs held for `hold` ticks at a time,
+    simulated on trimmed copies of the world. Expanded nodes are memoized
+    by tick and player state, and held inputs line up with fixed tick
+    boundaries, so work from one frame is reused by the next. Each call
+    stops searching once its `budget` (in seconds) is spent and falls back
+    on the best answer found so far.
+    """
+
+    def __init__(self, budget=0.0015, hold=6, depth=5, beam=4,
+                 use_jetpack=False):
+        """
+        Creates the autopilot.
+
+        Args:
+            budget (float): Search time allowed per call, in seconds.
+            hold (int): Number of ticks each searched input is held for.
+            depth (int): Number of held inputs searched ahead.
+            beam (int): Number of nodes kept at each depth.
+            use_jetpack (bool): Also consider toggling the jetpack.
+        """
+        self.budget = budget
+        self.hold = hold
+        self.depth = depth
+        self.beam = beam
+        self.actions = (0, ACTION_LEFT, ACTION_RIGHT)
+        if use_jetpack:
+            self.actions += (ACTION_JETPACK,)
+
+        self.memo = {}
+        self.action = 0
+        self.world = None
+        self.ticks = 0
+
+    def reset(self):
+        """
+        Forgets every searched node, for when the world starts a new run.
+        The memo keys don't say which run they belong to.
+        """
+        self.memo = {}
+        self.action = 0
+
+    def key(self, world, action):
+        """
+        Returns the memo key for applying `action` to `world`. The height
+        is measured against the tiles rather than the screen, so it stays
+        the same while the view scrolls.
+        """
+        return (
+            world.ticks,
+            round(world.player_x_pos),
+            round(world.player_y_pos - world.score * 1.6),
+            round(world.player_y_velocity * 2),
+            world.is_jetpack_on,
+            action,
+        )
+
+    def evaluate(self, world):
+        """
+        Scores a simulated world, higher is better. Staying alive beats
+        everything, then climbing, then having a tile to fall onto.
+        """
+        if world.game_over:
+            return -1e6 + world.ticks
+
+        value = world.score - world.player_y_pos * 0.1
+        if (
+            not world.is_jetpack_on
+            and world.player_y_velocity > 0
+            and next_landing(
+                world.player_x_pos,
+                world.player_y_pos,
+                world.player_y_velocity,
+                world.entities,
+            )
+            is None
+        ):
+            value -= 500
+        return value
+
+    def expand(self, world, action):
+        """
+        Simulates holding `action` until the next hold boundary.
+
+        Returns:
+            tuple: (value, world) for the resulting state.
+        """
+        key = self.key(world, action)
+        node = self.memo.get(key)
+        if node is None:
+            child = world.clone()
+            ticks = self.hold - child.ticks % self.hold
+
+            # A jetpack toggle only fires on the first tick
+            step_action = action
+            for _ in range(ticks):
+                child.step(step_action)
+                if child.game_over:
+                    break
+                step_action = action & ~ACTION_JETPACK
+
+            node = (self.evaluate(child), child)
+            self.memo[key] = node
+        return node
+
+    def choose(self, world):
+        """
+        Picks the input for the next tick of `world`.
+
+        Args:
+            world (World): The world about to be stepped.
+
+        Returns:
+            int: Bitmask of ACTION_* flags.
+        """
+        deadline = time.perf_counter() + self.budget
+
+        # Another world, or this one reset or loaded, starts a new run
+        if world is not self.world or world.ticks < self.ticks:
+            self.reset()
+            self.world = world
+        self.ticks = world.ticks
+
+        # Forget nodes the world has already moved past
+        if world.ticks % self.hold == 0:
+            self.memo = {
+                key: node
+                for key, node in self.memo.items()
+                if key[0] >= world.ticks
+            }
+
+        # Jetpack toggles are only searched on hold boundaries, so the
+        # autopilot can't flick it on and off every tick
+        actions = self.actions
+        if world.ticks % self.hold:
+            actions = (0, ACTION_LEFT, ACTION_RIGHT)
+
+        root = world.clone(HEIGHT)
+        frontier = []
+        for action in actions:
+            if time.perf_counter() > deadline:
+                # Out of time already, repeat the last input
+                return self.action & ~ACTION_JETPACK
+            value, child = self.expand(root, action)
+            frontier.append((value, action, child))
+
+        for _ in range(1, self.depth):
+            frontier.sort(key=lambda node: node[0], reverse=True)
+            candidates = []
+            out_of_time = False
+            for value, first, node in frontier[: self.beam]:
+                if node.game_over:
+                    candidates.append((value, first, node))
+                    continue
+                for action in self.actions:
+                    if time.perf_counter() > deadline:
+                        out_of_time = True
+                        break
+                    value, child = self.expand(node, action)
+                    candidates.append((value, first, child))
+                if out_of_time:
+                    break
+
+            if out_of_time:
+                # Keep what this depth managed alongside the last one
+                frontier += candidates
+                break
+            frontier = candidates
+
+        self.action = max(frontier, key=lambda node: node[0])[1]
+        return self.action
+
+
+class Renderer:
+    """
+    Interface between a World and whatever draws it.
+
+    `start` is called once when a run is shown and `draw` after every tick.
+    Keeping all drawing behind this seam lets the same simulation run with
+    the Tk canvas, with no output at all, or into an offscreen frame buffer.
+    This base class draws nothing, so it doubles as the null renderer.
+    """
+
+    def start(self, world):
+        """
+        Sets up the play scene for a run.
+
+        Args:
+            world (World): The run about to be drawn.
+        """
+
+    def draw(self, world):
+        """
+        Brings the picture up to date after a tick.
+
+        Args:
+            world (World): The run to draw.
+        """
+
+
+class NullRenderer(Renderer):
+    """Renderer for headless runs, every call is a no-op."""
+
+
+class TkRenderer(Renderer):
+    """
+    Draws the play scene on a Tk canvas.
+
+    Only entities inside the canvas get a canvas item (see `draw_entities`),
+    and the score text and player sprite are only touched when they change.
+    """
+
+    def __init__(self, canvas, images, font, scale=1):
+        """
+        Creates the renderer.
+
+        Args:
+            canvas (tk.Canvas): Canvas to draw on.
+            images (dict): PhotoImages for "background", "top",
+            "player_left", "player_right" and "kinds", a tuple indexed by
+            entity kind, already scaled.
+            font (font.Font): Font for the score.
+            scale (float): Canvas pixels per world pixel.
+        """
+        self.canvas = canvas
+        self.images = images
+        self.font = font
+        self.scale = scale
+        self.facing_left = False
+        self.score = None
+
+        # Lowered by the frame budget governor on slow machines
+        self.quality = QUALITY_LEVELS[0]
+        self.frame = 0
+
+    def start(self, world):
+        # Set up background and top UI layer
+        self.canvas.create_image(
+            0, 0, anchor="nw", image=self.images["background"]
+        )
+        self.canvas.create_image(
+            0, 0, anchor="nw", image=self.images["top"], tags="top"
+        )
+
+        # Display the score at the top-left of the screen
+        self.score = world.score
+        self.canvas.create_text(
+            10 * self.scale,
+            10 * self.scale,
+            anchor="nw",
+            font=self.font,
+            tags=("score", "top"),
+            text=f"{world.score}",
+            fill="white",
+        )
+
+        # Place the player image at the starting position
+        self.facing_left = False
+        self.canvas.create_image(
+            world.player_x_pos * self.scale,
+            world.player_y_pos * self.scale,
+            anchor="nw",
+            image=self.images["player_right"],
+            tags="player",
+        )
+        self.face(world.facing_left)
+
+        # Draw the initial tiles
+        self.draw_entities(world)
+
+    def draw(self, world):
+        # Show the new score, as often as the quality allows, and turn the
+        # sprite if needed
+        if (
+            world.score != self.score
+            and self.frame % self.quality["hud_every"] == 0
+        ):
+            self.score = world.score
+            self.canvas.itemconfig("score", text=world.score)
+        self.face(world.facing_left)
+
+        # Update the player's position on the canvas
+        self.canvas.coords(
+            "player",
+            world.player_x_pos * self.scale,
+            world.player_y_pos * self.scale,
+        )
+
+        # Draw what is on screen, raising the "top" tag to ensure
+        # newly created tiles don't cover the score
+        if self.draw_entities(world):
+            self.canvas.tag_raise("top")
+
+    def face(self, left):
+        """
+        Turns the player sprite, touching the canvas only when the
+        facing direction actually changes.
+
+        Args:
+            left (bool): True to face left, False to face right.
+        """
+        if left != self.facing_left:
+            self.facing_left = left
+            image = self.images["player_left" if left else "player_right"]
+            self.canvas.itemconfig("player", image=image)
+
+    def draw_entities(self, world):
+        """
+        Keeps the canvas in step with the entity store. Entities inside the
+        canvas get an image created or moved to their position, and the
+        image of any entity that has left the canvas is deleted, so the
+        number of canvas items depends only on what fits on screen.
+
+        Args:
+            world (World): The world whose entities are drawn.
+
+        Returns:
+            bool: True if any new canvas item was created.
+        """
+        entities = world.entities
+        items = entities.items
+        xs = entities.x
+        ys = entities.y
+        kinds = entities.kind
+        widths = entities.width
+        heights = entities.height
+        coords = self.canvas.coords
+        scale = self.scale
+        created = False
+
+        # Delete the images of entities the world has removed
+        for item in world.removed_items:
+            self.canvas.delete(item)
+        world.removed_items.clear()
+
+        # At lower quality, enemies far from the player move less often
+        self.frame += 1
+        skip_distant = self.frame % self.quality["distant_every"] != 0
+        player_y = world.player_y_pos
+
+        for i in range(len(entities)):
+            x = xs[i]
+            y = ys[i]
+            # Entities.in_view, inlined as it runs for every entity
+            if (
+                x + widths[i] > 0
+                and x < WIDTH
+                and y + heights[i] > 0
+                and y < HEIGHT
+            ):
+                if items[i]:
+                    if (
+                        skip_distant
+                        and kinds[i] == KIND_ENEMY
+                        and abs(y - player_y) > DISTANT_ENEMY
+                    ):
+                        continue
+                    coords(items[i], x * scale, y * scale)
+                else:
+                    kind = kinds[i]
+                    items[i] = self.canvas.create_image(
+                        x * scale,
+                        y * scale,
+                        anchor="nw",
+                        image=self.images["kinds"][kind],
+                        tags=(KIND_TAGS[kind]),
+                    )
+                    created = True
+            elif items[i]:
+                # Entity left the screen, keep only its logical state
+                self.canvas.delete(items[i])
+                items[i] = 0
+
+        return created
+
+
+def fit_scale(width, height):
+    """
+    Returns the largest scale, in steps of 1 / SCALE_STEP, at which the
+    game fits in a window of the given size.
+
+    Args:
+        width (int): Window width in pixels.
+        height (int): Window height in pixels.
+
+    Returns:
+        Fraction: The scale, at least MIN_SCALE.
+    """
+    steps = math.floor(min(width / WIDTH, height / HEIGHT) * SCALE_STEP)
+    return max(MIN_SCALE, Fraction(steps, SCALE_STEP))
+
+
+def ghost_image(image):
+    """
+    Returns a see-through copy of a sprite for drawing ghosts. Tk images
+    have no alpha, so every other pixel is made transparent instead.
+
+    Args:
+        image (tk.PhotoImage): Sprite to copy.
+
+    Returns:
+        tk.PhotoImage: The dithered copy.
+    """
+    ghost = image.copy()
+    for y in range(image.height()):
+        for x in range(y % 2, image.width(), 2):
+            ghost.transparency_set(x, y, True)
+    return ghost
+
+
+class ImageStore:
+    """
+    Sprites at any scale. Each PNG is decoded once, and each scaled copy
+    is made once with PhotoImage.zoom and subsample and then kept, in
+    memory and in a cache on disk, so resizing back and forth or starting
+    the game again at the same size scales nothing.
+    """
+
+    def __init__(self, directory="files", cache=SCALED_CACHE_DIR):
+        """
+        Creates an empty store, sprites are loaded when first asked for.
+
+        Args:
+            directory (str): Directory holding the sprite files.
+            cache (str): Directory for the scaled copies.
+        """
+        self.directory = directory
+        self.cache = cache
+        self.sources = {}
+        self.scaled = {}
+
+    def get(self, filename, scale):
+        """
+        Returns a sprite at the given scale.
+
+        Args:
+            filename (str): Sprite file name.
+            scale (Fraction): Scale to draw it at.
+
+        Returns:
+            tk.PhotoImage: The scaled sprite.
+        """
+        source = self.sources.get(filename)
+        if source is None:
+            source = tk.PhotoImage(file=os.path.join(self.directory, filename))
+            self.sources[filename] = source
+        if scale == 1:
+            return source
+
+        key = (filename, scale)
+        image = self.scaled.get(key)
+        if image is not None:
+            return image
+
+        # Use the copy on disk unless the sprite changed since it was made
+        source_path = os.path.join(self.directory, filename)
+        cache_path = os.path.join(
+            self.cache, f"{scale.numerator}-{scale.denominator}", filename
+        )
+        try:
+            if os.stat(cache_path).st_mtime >= os.stat(source_path).st_mtime:
+                image = tk.PhotoImage(file=cache_path)
+        except (OSError, tk.TclError):
+            image = None
+
+        if image is None:
+            image = source.zoom(scale.numerator).subsample(scale.denominator)
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                image.write(cache_path, format="png")
+            except (OSError, tk.TclError):
+                pass  # the cache is only a speed-up
+
+        self.scaled[key] = image
+        return image
+
+
+class FrameGovernor:
+    """
+    Picks a quality level from the running average cost of game_loop, so
+    slow machines trade detail for keeping up with the frame budget. It
+    drops a level as soon as the average is over budget, but only climbs
+    back after plenty of headroom for a while, so it doesn't flip back and
+    forth at the edge of the budget.
+    """
+
+    def __init__(self):
+        """Starts at full quality."""
+        self.level = 0
+        self.settled = 0  # frames since the last change
+        self.headroom = 0  # frames in a row with headroom
+
+    def update(self, cost, budget):
+        """
+        Counts one frame and decides whether the quality should change.
+
+        Args:
+            cost (float): Running average frame cost, in seconds.
+            budget (float): Frame budget, in seconds.
+
+        Returns:
+            int: The new level if it changed, otherwise None.
+        """
+        self.settled += 1
+        if cost < budget * GOVERNOR_HEADROOM:
+            self.headroom += 1
+        else:
+            self.headroom = 0
+        if self.settled < GOVERNOR_SETTLE:
+            return None
+
+        if cost > budget and self.level < len(QUALITY_LEVELS) - 1:
+            self.level += 1
+        elif self.headroom >= GOVERNOR_RESTORE and self.level > 0:
+            self.level -= 1
+        else:
+            return None
+        self.settled = 0
+        self.headroom = 0
+        return self.level
+
+
+class Racer:
+    """One player of a split-screen race: their world, viewport and keys."""
+
+    def __init__(self, name, world, renderer, binds):
+        """
+        Args:
+            name (str): Label shown on the player's viewport.
+            world (World): The player's run.
+            renderer (TkRenderer): Draws the run on the player's canvas.
+            binds (tuple): The player's (left, right, jetpack) keys.
+        """
+        self.name = name
+        self.world = world
+        self.renderer = renderer
+        self.binds = binds
+
 
 class RoboJump:
     """
@@ -31,91 +2668,98 @@ class RoboJump:
     and interactions with game elements like tiles, enemies, and power-ups.
     """
 
-    def __init__(self):
+    def __init__(self, lan=None, leaderboard=None):
         """
         Initializes the game window and sets up the initial state of the game.
 
         Args:
-            window: The tkinter window object used for creating
-            the game interface.
+            lan (netrace.RaceClient): Server to join a LAN race on straight
+            away, if any.
+            leaderboard (leaderboard.LeaderboardClient): Shared leaderboard
+            scores are also sent to, if any.
         """
         self.window = tk.Tk()
         self.window.title("Robo Jump")
-        self.window.resizable(False, False)
         self.canvas = tk.Canvas(self.window, width=WIDTH, height=HEIGHT)
         self.canvas.pack()
 
+        # The window can be resized, the game is scaled to fit it
+        self.scale = Fraction(1)
+        self.images = ImageStore()
+        self.screen = None
+
         self.main_menu = True
         self.playing = False
         self.paused = False
 
-        self.player_x_pos = START_X
-        self.player_y_pos = START_Y
-        self.player_y_velocity = -JUMP_STRENGTH
-        self.player_x_velocity = 0
-
-        self.score = 0
+        # Apply the tuned constants before anything copies them
+        self.config = ConfigWatcher()
+        self.config.poll()
+
+        # Frame cost readout, toggled with F3
+        self.show_frame_cost = False
+        self.frame_cost = 0.0
+        self.frame_cost_max = 0.0
+        self.frames = 0
+
+        self.world = World()
+        self.telemetry = Telemetry()
+        self.world.telemetry = self.telemetry
+        self.recording = None
+        self.trace = None
         self.name = "Bruh"
 
-        self.tiles = []
-        self.player_heights = []
+        # Shared leaderboard, its top scores are fetched in the background
+        self.leaderboard = leaderboard
+        if leaderboard is not None:
+            leaderboard.start()
         self.buttons = []
 
-        self.tile_y_pos = 70
-        self.enemy_chance = 0.1
-        self.space_between = 50
-        self.difficulty_level = 1000
-
         self.boss = None
-        self.is_jetpack_on = False
-        self.is_power_up_on = False
         self.open_from_save = False
         self.boss_key_pressed = False
 
+        self.autopilot = Autopilot()
+        self.autopilot_on = False
+        self.autopilot_budget = self.autopilot.budget
+
+        # Trades detail for speed when frames run over budget
+        self.governor = FrameGovernor()
+        self.quality = QUALITY_LEVELS[0]
+
+        # Ghosts of the best runs, raced when switched on in the menu
+        self.ghosts_on = False
+        self.ghosts = []
+
+        # Split-screen race in progress, if any
+        self.racers = []
+        self.race_players = 2
+
+        # LAN race client, the canvas items of the opponents, and the
+        # player's own physics and World while racing under the server's
+        self.lan = None
+        self.opponents = {}
+        self.lan_physics = None
+        self.lan_world = None
+
         self.left_bind = "Left"
         self.right_bind = "Right"
         self.boss_bind = "b"
         self.jetpack_bind = "j"
 
-        self.window.bind(f"<{self.left_bind}>", self.move_left)
-        self.window.bind(f"<{self.right_bind}>", self.move_right)
-        self.window.bind(f"<KeyRelease-{self.left_bind}>", self.stop_move)
-        self.window.bind(f"<KeyRelease-{self.right_bind}>", self.stop_move)
+        self.input = InputState()
+
+        self.window.bind(f"<{self.left_bind}>", self.hold_key)
+        self.window.bind(f"<{self.right_bind}>", self.hold_key)
+        self.window.bind(f"<KeyRelease-{self.left_bind}>", self.release_key)
+        self.window.bind(f"<KeyRelease-{self.right_bind}>", self.release_key)
         self.window.bind("<b>", self.display_work_screen)
-        self.window.bind("<j>", self.deploy_jet_pack)
+        self.window.bind(f"<{self.jetpack_bind}>", self.tap_key)
+        self.window.bind("<FocusOut>", lambda event: self.input.clear())
+        self.window.bind("<F3>", self.toggle_frame_cost)
 
         # assets
-        self.background_image = tk.PhotoImage(file="files/background.png")
-        self.boss_image = tk.PhotoImage(file="files/boss_image.png")
-        self.leaderboard_bg_image = tk.PhotoImage(
-            file="files/leaderboard_bg.png"
-        )
-        self.gameover_bg_image = tk.PhotoImage(file="files/game_over_bg.png")
-        self.player_right_image = tk.PhotoImage(file="files/bird_right.png")
-        self.player_left_image = tk.PhotoImage(file="files/bird_left.png")
-        self.main_menu_image = tk.PhotoImage(file="files/main_menu.png")
-        self.tile_image = tk.PhotoImage(file="files/regular_tile.png")
-        self.enemy_image = tk.PhotoImage(file="files/enemy.png")
-        self.save_game_btn_image = tk.PhotoImage(
-            file="files/save_game_btn_image.png"
-        )
-        self.leaderboard_btn_image = tk.PhotoImage(
-            file="files/leaderboard_btn_image.png"
-        )
-        self.menu_btn_image = tk.PhotoImage(file="files/menu_btn_image.png")
-        self.options_btn_image = tk.PhotoImage(
-            file="files/options_btn_image.png"
-        )
-        self.play_btn_image = tk.PhotoImage(file="files/play_btn_image.png")
-        self.saves_btn_image = tk.PhotoImage(file="files/saves_btn_image.png")
-        self.submit_name_btn_image = tk.PhotoImage(
-            file="files/submit_name_btn_image.png"
-        )
-        self.options_screen_image = tk.PhotoImage(file="files/options_bg.png")
-        self.top_image = tk.PhotoImage(file="files/top.png")
-        self.pause_btn_image = tk.PhotoImage(file="files/pause_btn.png")
-        self.play_icon_image = tk.PhotoImage(file="files/play_btn.png")
-        self.pause_screen_image = tk.PhotoImage(file="files/paused_bg.png")
+        self.load_images()
 
         self.window.tk.call(
             "font",
@@ -125,12 +2769,97 @@ class RoboJump:
             "imgs/DoodleJump.ttf",
         )
         self.custom_font = font.Font(family="DoodleJumpFont", size=25)
+        self.small_font = font.Font(family="DoodleJumpFont", size=12)
+
+        self.renderer = TkRenderer(
+            self.canvas, self.renderer_images(), self.custom_font
+        )
 
         self.init_main_menu()
+        self.window.bind("<Configure>", self.on_resize)
+        if lan is not None:
+            self.start_lan_race(lan)
 
         self.game_loop()
+        self.window.after(CONFIG_POLL_MS, self.poll_config)
 
         self.window.mainloop()
+        self.telemetry.close()
+        if self.leaderboard is not None:
+            self.leaderboard.close()
+
+    def load_images(self):
+        """Points the image attributes at the sprites for the current scale."""
+        for attribute, filename in IMAGE_FILES.items():
+            setattr(self, attribute, self.images.get(filename, self.scale))
+        self.kind_images = (self.tile_image, self.enemy_image)
+        self.ghost_image = ghost_image(self.player_right_image)
+
+    def renderer_images(self):
+        """Returns the sprites the TkRenderer draws the play scene with."""
+        return {
+            "background": self.background_image,
+            "top": self.top_image,
+            "player_left": self.player_left_image,
+            "player_right": self.player_right_image,
+            "kinds": self.kind_images,
+        }
+
+    def scaled(self, *values):
+        """Returns world coordinates converted to canvas pixels."""
+        return tuple(float(value * self.scale) for value in values)
+
+    def place(self, widget, x, y):
+        """
+        Places a widget at a position given in world coordinates.
+
+        Args:
+            widget: Tk widget to place.
+            x (float): Left edge at a scale of 1.
+            y (float): Top edge at a scale of 1.
+        """
+        widget.place(x=float(x * self.scale), y=float(y * self.scale))
+
+    def on_resize(self, event):
+        """
+        Rescales the game when the window changes size.
+
+        Args:
+            event (tk.Event): The window's Configure event.
+        """
+        # Races size the window for their viewports themselves
+        if event.widget is not self.window or self.racers:
+            return
+        scale = fit_scale(event.width, event.height)
+        if scale != self.scale:
+            self.rescale(scale)
+
+    def rescale(self, scale):
+        """
+        Switches to a new scale and redraws the current screen with
+        sprites and fonts to match. The game itself carries on unchanged,
+        only its presentation is scaled.
+
+        Args:
+            scale (Fraction): Canvas pixels per world pixel.
+        """
+        self.scale = scale
+        width, height = self.scaled(WIDTH, HEIGHT)
+        self.canvas.config(width=width, height=height)
+        self.load_images()
+        self.custom_font.configure(size=round(25 * scale))
+        self.small_font.configure(size=round(12 * scale))
+        self.renderer.images = self.renderer_images()
+        self.renderer.scale = float(scale)
+
+        if self.boss_key_pressed:
+            self.boss.config(width=width, height=height)
+            self.boss.delete("boss")
+            self.boss.create_image(
+                0, 0, anchor="nw", image=self.boss_image, tags=("boss")
+            )
+        if self.screen is not None:
+            self.screen()
 
     def init_main_menu(self):
         """
@@ -149,6 +2878,7 @@ class RoboJump:
         self.reset_canvas()
         self.main_menu = True
         self.playing = False
+        self.screen = self.init_main_menu
 
         # Set the background image for the main menu
         self.canvas.create_image(
@@ -164,7 +2894,7 @@ class RoboJump:
             command=self.switch_to_play,
             bd=0,
         )
-        play_btn.place(x=240, y=178)
+        self.place(play_btn, 240, 178)
 
         # Create and place the Options button
         options_btn = tk.Button(
@@ -173,7 +2903,7 @@ class RoboJump:
             command=self.switch_to_options,
             bd=0,
         )
-        options_btn.place(x=240, y=265)
+        self.place(options_btn, 240, 265)
 
         # Create and place the Leaderboard button
         leaderboard_btn = tk.Button(
@@ -182,7 +2912,7 @@ class RoboJump:
             command=self.switch_to_leaderboard,
             bd=0,
         )
-        leaderboard_btn.place(x=240, y=348)
+        self.place(leaderboard_btn, 240, 348)
 
         # Create and place the Saves button
         saves_btn = tk.Button(
@@ -191,7 +2921,7 @@ class RoboJump:
             command=self.switch_to_saves,
             bd=0,
         )
-        saves_btn.place(x=50, y=572)
+        self.place(saves_btn, 50, 572)
 
         # Initialize menu player position and velocity for the main menu
         self.menu_player_x_pos = 96
@@ -201,17 +2931,14 @@ class RoboJump:
 
         # Create the player image on the canvas
         self.menu_player = self.canvas.create_image(
-            96, 431, anchor="nw", image=self.player_right_image
+            *self.scaled(96, 431), anchor="nw", image=self.player_right_image
         )
 
         # Create a tile on the canvas
-        tile = self.canvas.create_image(
-            WIDTH // 4 - 50,
-            START_Y + TILE_HEIGHT,
-            anchor="nw",
-            image=self.tile_image,
+        self.world.entities.clear()
+        self.world.spawn_entity(
+            KIND_TILE, WIDTH // 4 - 50, START_Y + TILE_HEIGHT
         )
-        self.tiles.append(tile)
 
         # Initialize the variable for the player name input
         name_var = tk.StringVar()
@@ -220,7 +2947,7 @@ class RoboJump:
         name_entry = tk.Entry(
             self.window, width=6, font=self.custom_font, textvariable=name_var
         )
-        name_entry.place(x=228, y=430)
+        self.place(name_entry, 228, 430)
         self.buttons.append(name_entry)
 
         # Create and place the submit name button
@@ -230,7 +2957,35 @@ class RoboJump:
             command=lambda: self.submit_name(name_var.get()),
             bd=0,
         )
-        submit_name_btn.place(x=230, y=474)
+        self.place(submit_name_btn, 230, 474)
+
+        # Create and place the split-screen race buttons
+        race_btn = tk.Button(
+            self.window,
+            text=f"Race {self.race_players}P",
+            font=self.small_font,
+            command=self.start_race,
+        )
+        self.place(race_btn, 260, 580)
+        players_btn = tk.Button(
+            self.window,
+            text="Players +",
+            font=self.small_font,
+            command=lambda: self.cycle_race_players(race_btn),
+        )
+        self.place(players_btn, 350, 580)
+        self.buttons.append(race_btn)
+        self.buttons.append(players_btn)
+
+        # Create and place the ghost racing toggle
+        ghosts_btn = tk.Button(
+            self.window,
+            text=self.ghosts_label(),
+            font=self.small_font,
+        )
+        ghosts_btn.configure(command=lambda: self.toggle_ghosts(ghosts_btn))
+        self.place(ghosts_btn, 260, 540)
+        self.buttons.append(ghosts_btn)
 
         # Add all buttons to the list for potential management
         self.buttons.append(play_btn)
@@ -249,19 +3004,32 @@ class RoboJump:
         If in the game, it updates the player's position handles
         jetpack mechanics,checks collisions, and updates object positions.
         """
+        start = time.perf_counter()
+
+        # Sample the keyboard once per tick, even when it is not used.
+        # In a race the other players' samples consume the taps
+        action = self.input.sample(
+            self.left_bind,
+            self.right_bind,
+            self.jetpack_bind,
+            consume=not self.racers,
+        )
+
         if self.main_menu:
             # Update player's vertical velocity and position based on gravity
             self.menu_player_y_velocity += GRAVITY
             self.menu_player_y_pos += self.menu_player_y_velocity
 
             # Check for collision with tiles in the menu
-            for tile in self.tiles:
-                tile_x, tile_y = self.canvas.coords(tile)
+            entities = self.world.entities
+            for i in range(len(entities)):
+                tile_x = entities.x[i]
+                tile_y = entities.y[i]
 
                 # menu player is colliding with a tile
                 if (
                     self.menu_player_x_pos + PLAYER_WIDTH > tile_x
-                    and self.menu_player_x_pos < tile_x + TILE_WIDTH
+                    and self.menu_player_x_pos < tile_x + entities.width[i]
                     and self.menu_player_y_pos + PLAYER_HEIGHT <= tile_y
                     and self.menu_player_y_pos
                     + PLAYER_HEIGHT
@@ -271,49 +3039,127 @@ class RoboJump:
                     # Reset vertical velocity to simulate a jump
                     self.menu_player_y_velocity = JUMP_STRENGTH
 
-            # Update the position of the menu player on the canvas
-            self.canvas.coords(
-                self.menu_player,
-                self.menu_player_x_pos,
-                self.menu_player_y_pos,
-            )
+            # Update the position of the menu player on the canvas, as
+            # often as the quality allows
+            if self.frames % self.quality["menu_every"] == 0:
+                self.canvas.coords(
+                    self.menu_player,
+                    *self.scaled(
+                        self.menu_player_x_pos, self.menu_player_y_pos
+                    ),
+                )
+                self.renderer.draw_entities(self.world)
 
         elif self.playing:
-            # Apply gravity to the player's vertical velocity
-            self.player_y_velocity += GRAVITY
-
-            # Handle jetpack activation
-            if self.is_jetpack_on:
-                self.player_y_pos -= JETPACK_STRENGTH + 10  # Jetpack movement
-                self.player_y_velocity = (
-                    -15
-                )  # Override vertical velocity when jetpack is on
+            world = self.world
+
+            # The autopilot steers, the jetpack key still works
+            if self.autopilot_on:
+                action = self.autopilot.choose(world) | (
+                    action & ACTION_JETPACK
+                )
+            world.step(action)
+            if self.recording is not None:
+                self.recording.add(action)
+                self.trace.add(world)
+
+            if world.game_over:
+                self.ending_screen()
             else:
-                # Apply gravity if the jetpack is not on
-                self.player_y_pos += self.player_y_velocity
+                self.renderer.draw(world)
+                self.step_ghosts()
 
-            # Check and handle player's horizontal and vertical bounds
-            self.check_horizontal_bound()
-            self.check_vertical_bound()
+        elif self.racers:
+            self.race_tick(action)
 
-            # Move objects and enemies
-            self.move_objects()
-            self.move_enemy()
+        elif self.lan is not None:
+            self.lan_tick(action)
 
-            # Check for collisions
-            self.check_collision()
+        self.measure_frame(time.perf_counter() - start)
 
-            # Update the player's horizontal position
-            self.player_x_pos += self.player_x_velocity
+        # Call the game loop again after a set frame rate
+        self.window.after(FPS, self.game_loop)
 
-            # Update the player's position on the canvas
-            self.canvas.coords("player", self.player_x_pos, self.player_y_pos)
+    def measure_frame(self, cost):
+        """
+        Tracks how long game_loop takes and, when the readout is on,
+        shows the average and worst frame every FRAME_COST_READOUT frames.
 
-            # Raise the "top" tag to ensure tiles don't cover the score
-            self.canvas.tag_raise("top")
+        Args:
+            cost (float): Seconds the frame took.
+        """
+        self.frames += 1
+        self.frame_cost += (cost - self.frame_cost) * FRAME_COST_SMOOTHING
+        self.frame_cost_max = max(self.frame_cost_max, cost)
+
+        level = self.governor.update(self.frame_cost, FPS / 1000)
+        if level is not None:
+            self.set_quality(level)
+
+        if self.frames % FRAME_COST_READOUT:
+            return
+        if self.show_frame_cost and self.playing:
+            self.canvas.delete("frame_cost")
+            self.canvas.create_text(
+                *self.scaled(10, HEIGHT - 10),
+                anchor="sw",
+                font=self.small_font,
+                fill="white",
+                text=f"frame {self.frame_cost * 1000:.2f} ms, "
+                f"max {self.frame_cost_max * 1000:.2f} ms",
+                tags=("frame_cost", "top"),
+            )
+        self.frame_cost_max = 0.0
 
-        # Call the game loop again after a set frame rate
-        self.window.after(FPS, self.game_loop)
+    def set_quality(self, level):
+        """
+        Switches to a quality level picked by the frame budget governor,
+        logging the decision to telemetry and the console so degraded
+        cabinets show up in the logs.
+
+        Args:
+            level (int): Index into QUALITY_LEVELS.
+        """
+        self.quality = QUALITY_LEVELS[level]
+        self.autopilot.budget = (
+            self.autopilot_budget * self.quality["lookahead"]
+        )
+        self.renderer.quality = self.quality
+        for racer in self.racers:
+            racer.renderer.quality = self.quality
+
+        frame_ms = round(self.frame_cost * 1000, 3)
+        self.telemetry.emit(
+            "quality",
+            level=level,
+            frame_ms=frame_ms,
+            budget_ms=FPS,
+            host=socket.gethostname(),
+        )
+        print(f"Quality level {level}: frame {frame_ms} ms, budget {FPS} ms")
+
+    def toggle_frame_cost(self, event):
+        """Shows or hides the frame cost readout."""
+        self.show_frame_cost = not self.show_frame_cost
+        if not self.show_frame_cost:
+            self.canvas.delete("frame_cost")
+
+    def poll_config(self):
+        """
+        Reloads the config file if it changed, then checks again after
+        CONFIG_POLL_MS. Tuned difficulty applies to the current run, the
+        ramp carries on from where it was. The recording of the run keeps
+        the reload so it replays the same.
+        """
+        # A LAN race keeps the server's config so every run matches
+        if self.lan is None and self.config.poll():
+            self.world.retune(DIFFICULTY)
+            if self.recording is not None:
+                self.recording.retune(
+                    {**physics(), "difficulty": dict(DIFFICULTY)}
+                )
+            print("Config reloaded")
+        self.window.after(CONFIG_POLL_MS, self.poll_config)
 
     def reset_canvas(self):
         """
@@ -323,30 +3169,14 @@ class RoboJump:
         # Clear all items from the canvas
         self.canvas.delete("all")
 
-        # Destroy any buttons that were added to the window
-        for btn in self.buttons:
-            btn.destroy()
-
-        # Reset values if starting from a new game (not from save)
-        if not self.open_from_save:
-            self.player_x_pos = START_X
-            self.player_y_pos = START_Y
-            self.player_y_velocity = -JUMP_STRENGTH
-            self.player_x_velocity = 0
-
-        # Reset game state flags
-        self.is_jetpack_on = False  # Jetpack is off initially
-        self.is_power_up_on = False  # Power-ups are not active
+        # Destroy any buttons that were added to the window
+        for btn in self.buttons:
+            btn.destroy()
 
-        # Reinitialize game variables
+        # Reinitialize game variables, the world's canvas items are gone
         self.buttons = []
-        self.tiles = []
-        self.player_heights = []
-        self.open_from_save = False
-        self.tile_y_pos = 70
-        self.enemy_chance = 0.1
-        self.space_between = 50
-        self.difficulty_level = 1000
+        self.world.entities.forget_items()
+        self.world.removed_items.clear()
 
     def switch_to_play(self):
         """
@@ -356,28 +3186,42 @@ class RoboJump:
         """
         self.reset_canvas()
 
+        # Start a new level unless the world was just loaded from a save.
+        # Only fresh levels are recorded, a save can't be replayed from a seed
+        # Ghosts start with the level, so they only join fresh ones
+        self.stop_ghosts()
+        self.autopilot.reset()
+        if self.open_from_save:
+            self.open_from_save = False
+            self.recording = None
+            self.trace = None
+        else:
+            seed = random.getrandbits(32)
+            self.world.reset(seed)
+            self.recording = Recording(seed, self.world.difficulty)
+            self.trace = Trace(self.world)
+            self.start_ghosts()
+        self.world.emit("run_start", from_save=self.recording is None)
+
         # Set the game state to playing and hide the main menu
         self.playing = True
         self.main_menu = False
+        self.draw_play_screen()
 
-        # Set up background and top UI layer
-        self.canvas.create_image(
-            0, 0, anchor="nw", image=self.background_image
-        )
-        self.canvas.create_image(
-            0, 0, anchor="nw", image=self.top_image, tags="top"
-        )
+    def draw_play_screen(self):
+        """
+        Draws the play screen for the current world, with the pause
+        overlay if the game is paused. Also used to redraw it at a new
+        scale.
+        """
+        self.reset_canvas()
+        self.screen = self.draw_play_screen
 
-        # Display the score at the top-left of the screen
-        self.canvas.create_text(
-            10,
-            10,
-            anchor="nw",
-            font=self.custom_font,
-            tags=("score", "top"),
-            text=f"{self.score}",
-            fill="white",
-        )
+        # Draw the background, score, player and initial tiles
+        self.renderer.start(self.world)
+        for ghost in self.ghosts:
+            ghost.item = None
+        self.draw_ghosts()
 
         # Add a pause button to the top-right corner
         self.pause_btn = tk.Button(
@@ -386,49 +3230,53 @@ class RoboJump:
             command=self.pause_game,
             bd=0,
         )
-        self.pause_btn.place(x=WIDTH - 36 - 13, y=4)
+        self.place(self.pause_btn, WIDTH - 36 - 13, 4)
         self.buttons.append(self.pause_btn)
 
-        # Place the player image at the starting position
-        self.canvas.create_image(
-            self.player_x_pos,
-            self.player_y_pos,
-            anchor="nw",
-            image=self.player_right_image,
-            tags="player",
+        # Add the autopilot toggle next to the pause button
+        self.autopilot_btn = tk.Button(
+            self.window,
+            text=self.autopilot_label(),
+            font=self.small_font,
+            command=self.toggle_autopilot,
         )
+        self.place(self.autopilot_btn, WIDTH - 36 - 13 - 90, 10)
+        self.buttons.append(self.autopilot_btn)
 
-        # Add initial tiles to the canvas
-        self.add_initial_tiles()
-
-    def check_horizontal_bound(self):
-        """
-        checks if the player goes beyond the screen horizontally
-        Moves the position of the player to create a teleportation effect
-        """
-        if self.player_x_pos >= WIDTH:
-            self.player_x_pos = 1
-        elif self.player_x_pos <= 0:
-            self.player_x_pos = WIDTH - 1
-
-    def check_vertical_bound(self):
-        """
-        checks if the player has fallen of the bottom
-        to end the game
-        """
-        if self.player_y_pos >= HEIGHT:  # if player falls of the bottom
-            self.ending_screen()
+        if not self.playing:
+            self.show_pause()
 
     def ending_screen(self):
         """
         Displays the game over screen with the player's score, high score,
         and options to go back to the main menu or view the leaderboard.
         """
-        score = self.score
+        score = self.world.score
         self.playing = False
-        self.reset_canvas()
         self.main_menu = False
 
+        self.update_score()
+        if self.leaderboard is not None:
+            self.leaderboard.submit(self.name, score)
+        self.save_recording()
+        self.stop_ghosts()
+
+        # The shared leaderboard's cache may not have this run in it yet
+        best = self.leaderboard_scores()[0].rpartition(":")[2]
+        high_score = max(score, float(best))
+        self.draw_ending_screen(score, high_score)
+
+    def draw_ending_screen(self, score, high_score):
+        """
+        Draws the game over screen.
+
+        Args:
+            score (float): Score of the run that just ended.
+            high_score (float): Best score on the leaderboard.
+        """
+        self.reset_canvas()
+        self.screen = lambda: self.draw_ending_screen(score, high_score)
+
         self.canvas.create_image(
             0, 0, anchor="nw", image=self.gameover_bg_image
         )
@@ -438,7 +3286,7 @@ class RoboJump:
             command=self.init_main_menu,
             bd=0,
         )
-        menu_btn.place(x=144, y=394)
+        self.place(menu_btn, 144, 394)
         self.buttons.append(menu_btn)
 
         leaderboard_btn = tk.Button(
@@ -447,275 +3295,463 @@ class RoboJump:
             command=self.switch_to_leaderboard,
             bd=0,
         )
-        leaderboard_btn.place(x=144, y=474)
+        self.place(leaderboard_btn, 144, 474)
         self.buttons.append(leaderboard_btn)
 
-        self.update_score()
-        high_score = self.read_scores()[0].split()[1]
-
         self.canvas.create_text(
-            244,
-            170,
+            *self.scaled(244, 170),
             font=self.custom_font,
             text=f"Your score: {score}",
             fill="white",
         )
         self.canvas.create_text(
-            244,
-            210,
+            *self.scaled(244, 210),
             font=self.custom_font,
             text=f"High score: {high_score}",
             fill="white",
         )
         self.canvas.create_text(
-            244,
-            250,
+            *self.scaled(244, 250),
             font=self.custom_font,
             text=f"Your Name: {self.name}",
             fill="white",
         )
 
-        self.score = 0
-
-    def check_collision(self):
-        """
-        Checks for collisions between the player and tiles.
-        If the jetpack is off,the player will collide with enemies or tiles.
-        Removes tiles that fall off the screen.
+    def cycle_race_players(self, button):
         """
-        for tile in self.tiles:
-            tile_x, tile_y = self.canvas.coords(tile)
-            tag = self.canvas.gettags(tile)[0]
-
-            if not self.is_jetpack_on:
-                if tag == "enemy":
-                    tile_width = PLAYER_WIDTH
-                    is_colliding = (
-                        # player's right side is beyond the tile's left
-                        self.player_x_pos + PLAYER_WIDTH > tile_x
-                        # player's left side is within the tile's width
-                        and self.player_x_pos < tile_x + tile_width
-                        # player's bottom is above the tile's top
-                        and self.player_y_pos + PLAYER_HEIGHT > tile_y
-                        # player's top is below the tile's bottom
-                        and self.player_y_pos < tile_y + TILE_HEIGHT
-                    )
-
-                    if is_colliding:
-                        self.ending_screen()
-                        break
-
-                else:
-                    tile_width = TILE_WIDTH
-                    is_colliding = (
-                        # player's right side is beyond the tile's left
-                        self.player_x_pos + PLAYER_WIDTH > tile_x
-                        # player's left side is within the tile's width
-                        and self.player_x_pos < tile_x + tile_width
-                        # player's bottom is at or above the tile's top
-                        and self.player_y_pos + PLAYER_HEIGHT <= tile_y
-                        # player will land on the tile
-                        and self.player_y_pos
-                        + PLAYER_HEIGHT
-                        + self.player_y_velocity
-                        >= tile_y
-                    )
-
-                    if is_colliding:
-                        self.player_y_velocity = JUMP_STRENGTH
+        Steps the number of race players through 2 to RACE_MAX_PLAYERS.
 
-            # Remove tiles that fall beyond the height limit
-            if tile_y >= HEIGHT:
-                self.canvas.delete(tile)
-                self.tiles.remove(tile)
+        Args:
+            button (tk.Button): The race button, relabelled to match.
+        """
+        if self.race_players < RACE_MAX_PLAYERS:
+            self.race_players += 1
+        else:
+            self.race_players = 2
+        button.configure(text=f"Race {self.race_players}P")
 
-    def move_objects(self):
+    def start_race(self):
         """
-        Moves objects (tiles, player, etc.) based on the player's movement.
-        Adjusts tiles and adds score when the player moves above certain
-        height all objects will move down to
-        replicate a scrolling effect
+        Starts a split-screen race on one shared level. Each player gets a
+        World and a canvas of their own, side by side, while the sprites
+        and the game loop tick are shared by all of them.
         """
-        self.player_heights.append(self.player_y_pos)
-        value = 244  # Player height limit
+        self.reset_canvas()
+        self.main_menu = False
+        self.playing = False
+        self.screen = None
+
+        # Shrink the viewports until they all fit across the screen
+        count = self.race_players
+        scale = min(
+            self.scale,
+            fit_scale(
+                self.window.winfo_screenwidth() / count,
+                self.window.winfo_screenheight() * 0.9,
+            ),
+        )
+        width, height = float(WIDTH * scale), float(HEIGHT * scale)
+        self.canvas.config(width=width * count, height=height)
+
+        images = {
+            key: self.images.get(IMAGE_FILES[attribute], scale)
+            for key, attribute in (
+                ("background", "background_image"),
+                ("top", "top_image"),
+                ("player_left", "player_left_image"),
+                ("player_right", "player_right_image"),
+            )
+        }
+        images["kinds"] = (
+            self.images.get(IMAGE_FILES["tile_image"], scale),
+            self.images.get(IMAGE_FILES["enemy_image"], scale),
+        )
+        self.race_font = font.Font(
+            family="DoodleJumpFont", size=round(25 * scale)
+        )
 
-        # player is visually above the threshold and falling or using jetpack
-        if self.player_y_pos <= value and (
-            self.player_y_velocity <= 0 or self.is_power_up_on
-        ):
-            # Calculate the distance moved to replicate player falling
-            higher_height = self.player_heights[-1]
-            lower_height = self.player_heights[-2]
-            distance = -higher_height + lower_height
+        # Everyone races the same level
+        seed = random.getrandbits(32)
+        binds = ((self.left_bind, self.right_bind, self.jetpack_bind),)
+        binds += RACE_BINDS[: count - 1]
+        self.racers = []
+        for index, keys in enumerate(binds):
+            left, right, jetpack = keys
+            self.window.bind(f"<{left}>", self.hold_key)
+            self.window.bind(f"<{right}>", self.hold_key)
+            self.window.bind(f"<KeyRelease-{left}>", self.release_key)
+            self.window.bind(f"<KeyRelease-{right}>", self.release_key)
+            self.window.bind(f"<{jetpack}>", self.tap_key)
+
+            canvas = tk.Canvas(
+                self.window, width=width, height=height, highlightthickness=0
+            )
+            canvas.place(x=index * width, y=0)
+            self.buttons.append(canvas)
+
+            racer = Racer(
+                f"P{index + 1}",
+                World(seed),
+                TkRenderer(canvas, images, self.race_font, float(scale)),
+                keys,
+            )
+            racer.renderer.quality = self.quality
+            racer.renderer.start(racer.world)
+            canvas.create_text(
+                width - 10,
+                10,
+                anchor="ne",
+                font=self.race_font,
+                text=f"{racer.name} {left}/{right}/{jetpack}",
+                fill="white",
+                tags="top",
+            )
+            self.racers.append(racer)
 
-            # Add the distance to the score and add new tiles
-            self.add_score(distance)
-            self.add_tiles()
+        # Players who stop playing would bounce forever, so allow ending it
+        end_btn = tk.Button(
+            self.window,
+            text="End race",
+            font=self.small_font,
+            command=self.end_race,
+        )
+        end_btn.place(x=width * count - 90 * float(scale), y=height - 40)
+        self.buttons.append(end_btn)
 
-            # Move all objects (tiles) by the calculated distance
-            for object in self.tiles:
-                self.canvas.move(object, 0, distance * 1.6)
+    def race_tick(self, action):
+        """
+        Advances every racer still in the race by one tick.
 
-            # Adjust the player's vertical position by the distance moved
-            self.player_y_pos += distance * 2
+        Args:
+            action (int): The first player's action, already sampled.
+        """
+        last = len(self.racers) - 1
+        finished = True
+        for index, racer in enumerate(self.racers):
+            if index:
+                action = self.input.sample(*racer.binds, consume=index == last)
+            world = racer.world
+            if world.game_over:
+                continue
+
+            world.step(action)
+            if world.game_over:
+                scale = racer.renderer.scale
+                racer.renderer.canvas.create_text(
+                    WIDTH / 2 * scale,
+                    HEIGHT / 2 * scale,
+                    font=self.race_font,
+                    text=f"{racer.name} out: {world.score:.0f}",
+                    fill="white",
+                )
+            else:
+                racer.renderer.draw(world)
+                finished = False
 
-        # Keep track of only the last 5 player heights to avoid memory bloat
-        self.player_heights = self.player_heights[-5:]
+        if finished:
+            self.end_race()
 
-    def add_tiles(self):
-        """
-        Adds new tiles or enemies to the game based on the current
-        score and difficulty.The space between tiles increases as
-        the player's score rises. The function spawns either an enemy
-        or a regular tile, and ensures no collisions with existing tiles.
+    def end_race(self):
+        """Ends the race, whoever is still running, and shows the results."""
+        self.race_results(
+            [(racer.name, racer.world.score) for racer in self.racers]
+        )
+
+    def race_results(self, results):
         """
-        # Increase space between tiles and raise difficulty based on score
-        if self.score > self.difficulty_level:
-            self.space_between += 50
-            self.difficulty_level += 1000
+        Ends the race and shows the players ranked by score.
 
-        x = random.randint(
-            0, 380
-        )  # Random horizontal position within the canvas width
-        y = (
-            self.tile_y_pos - self.space_between
-        )  # Vertical position adjusted for space
+        Args:
+            results (list): (name, score) of every player.
+        """
+        self.racers = []
+        self.reset_canvas()
+        self.screen = lambda: self.race_results(results)
+        width, height = self.scaled(WIDTH, HEIGHT)
+        self.canvas.config(width=width, height=height)
 
-        # Randomly choose between spawning an enemy or a regular tile
-        spawn_choice = random.random()
-        if spawn_choice < self.enemy_chance:
-            # Spawn an enemy
-            spawned_object = self.canvas.create_image(
-                x, y, anchor="nw", image=self.enemy_image, tags=("enemy")
-            )
-        else:
-            # Spawn a regular tile
-            spawned_object = self.canvas.create_image(
-                x, y, anchor="nw", image=self.tile_image, tags=("tile")
+        self.canvas.create_image(
+            0, 0, anchor="nw", image=self.gameover_bg_image
+        )
+        ranking = sorted(results, key=lambda result: result[1], reverse=True)
+        y_pos = 150
+        for place, (name, score) in enumerate(ranking, 1):
+            self.canvas.create_text(
+                *self.scaled(244, y_pos),
+                font=self.custom_font,
+                text=f"{place}. {name}: {score:.0f}",
+                fill="white",
             )
+            y_pos += 40
 
-        # Add the newly spawned object to the tiles list
-        self.tiles.append(spawned_object)
-
-        # Update the vertical position for the next tile spawn
-        self.tile_y_pos = y
+        menu_btn = tk.Button(
+            self.window,
+            image=self.menu_btn_image,
+            command=self.init_main_menu,
+            bd=0,
+        )
+        self.place(menu_btn, 144, 394)
+        self.buttons.append(menu_btn)
 
-    def add_score(self, additional_score):
+    def start_lan_race(self, client):
         """
-        Adds to the player's score based on their movement or height change.
+        Joins a LAN race. The run starts once the server has sent every
+        player the shared seed, until then the player waits.
 
         Args:
-            additional_score (int or float): Amount to increase the score by.
+            client (netrace.RaceClient): Connection to the race server.
         """
-        self.score += additional_score
-        self.canvas.itemconfig("score", text=self.score)
+        self.main_menu = False
+        self.playing = False
+        self.lan = client
+        self.lan_started = False
+        client.start()
+        self.draw_lan_screen()
 
-    def move_enemy(self):
+    def draw_lan_screen(self):
         """
-        Moves the enemy objects across the screen. If an enemy goes off the
-        screen (right side), it is reset to the left side.
+        Draws the LAN race, or the wait for it to start. Also used to
+        redraw it at a new scale.
         """
-        for object in self.tiles:
-            x, y = self.canvas.coords(object)
-            tag = self.canvas.gettags(object)[0]
+        self.reset_canvas()
+        self.screen = self.draw_lan_screen
+        self.opponents = {}
 
-            if tag == "enemy":
-                if x > WIDTH:
-                    self.canvas.moveto(object, -PLAYER_WIDTH, y)
-                else:
-                    self.canvas.move(object, 1, 0)
+        if self.lan_started:
+            self.renderer.start(self.world)
+        else:
+            self.canvas.create_image(
+                0, 0, anchor="nw", image=self.background_image
+            )
+            self.canvas.create_text(
+                *self.scaled(WIDTH / 2, HEIGHT / 2),
+                font=self.custom_font,
+                text="Waiting for players...",
+                fill="white",
+                tags="lan_status",
+            )
+        if self.world.game_over:
+            self.show_lan_out()
 
-    def add_initial_tiles(self):
+        leave_btn = tk.Button(
+            self.window,
+            text="Leave",
+            font=self.small_font,
+            command=self.end_lan_race,
+        )
+        self.place(leave_btn, WIDTH - 70, 10)
+        self.buttons.append(leave_btn)
+
+    def lan_tick(self, action):
         """
-        Adds the initial set of tiles to the canvas in specific positions.
-        The tiles are placed in a grid-like pattern around the player's
-        initial position.
+        Advances the local run of a LAN race by one tick and shows where
+        the opponents are. Network traffic is left to the client's own
+        thread, this only swaps in its latest snapshot.
+
+        Args:
+            action (int): The player's action, already sampled.
         """
-        start = self.canvas.create_image(
-            self.player_x_pos,
-            self.player_y_pos + PLAYER_HEIGHT + TILE_HEIGHT,
-            anchor="nw",
-            image=self.tile_image,
-            tags=("tile"),
-        )
+        client = self.lan
+        if not self.lan_started:
+            if client.error is not None:
+                print("LAN race:", client.error)
+                self.end_lan_race()
+            elif client.seed is not None:
+                # Same seed, difficulty and physics as the server, so the
+                # same level. The player's own physics and World, with its
+                # difficulty, come back after.
+                self.lan_physics = physics()
+                try:
+                    apply_config(client.physics)
+                except ValueError as error:
+                    print("LAN race:", error)
+                    self.end_lan_race()
+                    return
+                self.lan_world = self.world
+                self.world = World(client.seed, client.difficulty)
+                self.world.telemetry = self.telemetry
+                self.world.emit("run_start", from_save=False, lan=True)
+                self.lan_started = True
+                self.draw_lan_screen()
+            return
+
+        world = self.world
+        latest = client.latest
+        if not world.game_over:
+            world.step(action)
+            client.send(action)
+            if world.game_over:
+                self.show_lan_out()
+            else:
+                self.renderer.draw(world)
+        self.draw_opponents(latest)
 
-        quadrant_width = WIDTH // 2
-        quadrant_height = HEIGHT // 2
+        # The race is over once the server says nobody is still running
+        if client.error is not None or (
+            len(latest) == len(client.names)
+            and not any(state[3] for state in latest.values())
+        ):
+            self.end_lan_race()
 
-        tile1 = self.canvas.create_image(
-            quadrant_width // 3,  # x = 240 // 3 = 80
-            quadrant_height // 3,  # y = 320 // 3 = 106
-            anchor="nw",
-            image=self.tile_image,
-            tags=("tile"),
+    def show_lan_out(self):
+        """Tells the player their run is over while the others finish."""
+        self.canvas.create_text(
+            *self.scaled(WIDTH / 2, HEIGHT / 2),
+            font=self.custom_font,
+            text=f"Out: {self.world.score:.0f}",
+            fill="white",
+            tags="top",
         )
 
-        tile2 = self.canvas.create_image(
-            quadrant_width // 3 * 2,  # x = 240 // 3 * 2 = 160
-            quadrant_height // 3 * 2,  # y = 320 // 3 * 2 = 213
-            anchor="nw",
-            image=self.tile_image,
-            tags=("tile"),
-        )
+    def draw_opponents(self, states):
+        """
+        Moves a marker for every opponent to their height relative to the
+        player, pinned to the edge of the screen when they are out of
+        view.
 
-        tile3 = self.canvas.create_image(
-            quadrant_width + quadrant_width // 3,  # x = 360 + 240 // 3 = 400
-            quadrant_height // 3,  # y = 106
-            anchor="nw",
-            image=self.tile_image,
-            tags=("tile"),
+        Args:
+            states (dict): Player id to (x, altitude, score, alive), from
+            the latest snapshot.
+        """
+        world = self.world
+        for player, (x, altitude, score, alive) in states.items():
+            if player == self.lan.player:
+                continue
+            y = world.player_y_pos - (altitude - world.altitude())
+            y = min(max(y, 0), HEIGHT - PLAYER_HEIGHT)
+            label = f"{self.lan.names[player]} {score}"
+            if not alive:
+                label += " out"
+
+            items = self.opponents.get(player)
+            if items is None:
+                image = self.canvas.create_image(
+                    *self.scaled(x, y),
+                    anchor="nw",
+                    image=self.player_right_image,
+                )
+                text = self.canvas.create_text(
+                    *self.scaled(x + PLAYER_WIDTH / 2, y),
+                    anchor="s",
+                    font=self.small_font,
+                    text=label,
+                    fill="white",
+                )
+                self.opponents[player] = [image, text, label]
+                continue
+
+            image, text, shown = items
+            self.canvas.coords(image, *self.scaled(x, y))
+            self.canvas.coords(text, *self.scaled(x + PLAYER_WIDTH / 2, y))
+            if label != shown:
+                items[2] = label
+                self.canvas.itemconfig(text, text=label)
+
+    def end_lan_race(self):
+        """Leaves the LAN race and shows the scores as last reported."""
+        client = self.lan
+        self.lan = None
+        client.close()
+        if self.lan_physics is not None:
+            apply_config(self.lan_physics)
+            self.lan_physics = None
+        if self.lan_world is not None:
+            self.world = self.lan_world
+            self.lan_world = None
+
+        if not self.lan_started:
+            self.init_main_menu()
+            return
+        self.race_results(
+            [
+                (client.names[player], state[2])
+                for player, state in client.latest.items()
+            ]
         )
 
-        tile4 = self.canvas.create_image(
-            quadrant_width
-            + quadrant_width // 3 * 2,  # x = 360 + 240 // 3 * 2 = 480
-            quadrant_height // 3 * 2,  # y = 213
-            anchor="nw",
-            image=self.tile_image,
-            tags=("tile"),
-        )
+    def ghosts_label(self):
+        """Returns the text for the ghost racing button."""
+        return "Ghosts: On" if self.ghosts_on else "Ghosts: Off"
 
-        tile5 = self.canvas.create_image(
-            quadrant_width // 3,  # x = 80
-            quadrant_height + quadrant_height // 3,  # y = 480 + 106 = 586
-            anchor="nw",
-            image=self.tile_image,
-            tags=("tile"),
-        )
+    def toggle_ghosts(self, button):
+        """
+        Switches racing the best runs' ghosts on or off for new games.
 
-        tile6 = self.canvas.create_image(
-            quadrant_width // 3 * 2,  # x = 160
-            quadrant_height + quadrant_height // 3 * 2,  # y = 480 + 213 = 693
-            anchor="nw",
-            image=self.tile_image,
-            tags=("tile"),
-        )
+        Args:
+            button (tk.Button): The ghosts button, relabelled to match.
+        """
+        self.ghosts_on = not self.ghosts_on
+        button.configure(text=self.ghosts_label())
 
-        tile7 = self.canvas.create_image(
-            quadrant_width + quadrant_width // 3,  # x = 400
-            quadrant_height + quadrant_height // 3,  # y = 586
-            anchor="nw",
-            image=self.tile_image,
-            tags=("tile"),
-        )
+    def start_ghosts(self):
+        """
+        Loads the traces of the top GHOSTS_SHOWN leaderboard runs, if
+        ghosts are switched on. Leaderboard entries are matched to traces
+        by name and score.
+        """
+        if not self.ghosts_on or not os.path.isdir(RECORDINGS_DIR):
+            return
+
+        wanted = []
+        for entry in self.read_scores()[:GHOSTS_SHOWN]:
+            name, _, score = entry.rpartition(":")
+            wanted.append((name, float(score)))
+
+        for filename in sorted(os.listdir(RECORDINGS_DIR)):
+            if not filename.endswith(".trace"):
+                continue
+            try:
+                ghost = Ghost(os.path.join(RECORDINGS_DIR, filename))
+            except (OSError, ValueError):
+                continue
+            if (ghost.name, ghost.score) in wanted:
+                wanted.remove((ghost.name, ghost.score))
+                self.ghosts.append(ghost)
+            else:
+                ghost.close()
+
+    def step_ghosts(self):
+        """Moves every ghost on by a tick, dropping those whose run ended."""
+        for ghost in self.ghosts:
+            if not ghost.step():
+                self.canvas.delete(ghost.item)
+                ghost.close()
+        self.ghosts = [ghost for ghost in self.ghosts if not ghost.data.closed]
+        self.draw_ghosts()
+
+    def draw_ghosts(self):
+        """
+        Moves each ghost's sprite to its height relative to the player,
+        one canvas call per ghost.
+        """
+        world = self.world
+        altitude = world.altitude()
+        for ghost in self.ghosts:
+            x, y = self.scaled(
+                ghost.x, world.player_y_pos - (ghost.altitude - altitude)
+            )
+            if ghost.item is None:
+                ghost.item = self.canvas.create_image(
+                    x, y, anchor="nw", image=self.ghost_image, tags="ghost"
+                )
+            else:
+                self.canvas.coords(ghost.item, x, y)
 
-        tile8 = self.canvas.create_image(
-            quadrant_width + quadrant_width // 3 * 2,  # x = 480
-            quadrant_height + quadrant_height // 3 * 2,  # y = 693
-            anchor="nw",
-            image=self.tile_image,
-            tags=("tile"),
-        )
+    def stop_ghosts(self):
+        """Removes the ghosts and unmaps their traces."""
+        self.canvas.delete("ghost")
+        for ghost in self.ghosts:
+            ghost.close()
+        self.ghosts = []
+
+    def autopilot_label(self):
+        """Returns the text for the autopilot button."""
+        return "Auto: On" if self.autopilot_on else "Auto: Off"
 
-        self.tiles.append(start)
-        self.tiles.append(tile1)
-        self.tiles.append(tile2)
-        self.tiles.append(tile3)
-        self.tiles.append(tile4)
-        self.tiles.append(tile5)
-        self.tiles.append(tile6)
-        self.tiles.append(tile7)
-        self.tiles.append(tile8)
+    def toggle_autopilot(self):
+        """Switches the autopilot on or off for the current game."""
+        self.autopilot_on = not self.autopilot_on
+        self.autopilot_btn.configure(text=self.autopilot_label())
 
     def pause_game(self):
         """
@@ -731,31 +3767,39 @@ class RoboJump:
         """
         # Stops the game from playing
         self.playing = not self.playing
+        self.world.emit("pause", paused=not self.playing)
 
         if not self.playing:
-            # Show the pause screen and change buttons
-            self.canvas.create_image(
-                0, 0, anchor="nw", image=self.pause_screen_image, tags="pause"
-            )
-            self.pause_btn.config(image=self.play_icon_image)
-
-            # Add the save game button
-            self.save_game_btn = tk.Button(
-                self.window,
-                image=self.save_game_btn_image,
-                command=self.save_game,
-                bd=0,
-            )
-            self.buttons.append(self.save_game_btn)
-            self.save_game_btn.place(x=144, y=320)
-
+            self.show_pause()
         else:
-            # Remove the save game button and revert to the pause button
-            self.save_game_btn.destroy()
-            self.pause_btn.config(image=self.pause_btn_image)
+            self.hide_pause()
+
+    def show_pause(self):
+        """Shows the pause screen and the save game button."""
+        # Show the pause screen and change buttons
+        self.canvas.create_image(
+            0, 0, anchor="nw", image=self.pause_screen_image, tags="pause"
+        )
+        self.pause_btn.config(image=self.play_icon_image)
+
+        # Add the save game button
+        self.save_game_btn = tk.Button(
+            self.window,
+            image=self.save_game_btn_image,
+            command=self.save_game,
+            bd=0,
+        )
+        self.buttons.append(self.save_game_btn)
+        self.place(self.save_game_btn, 144, 320)
+
+    def hide_pause(self):
+        """Removes the pause screen and the save game button."""
+        # Remove the save game button and revert to the pause button
+        self.save_game_btn.destroy()
+        self.pause_btn.config(image=self.pause_btn_image)
 
-            # Remove the pause screen
-            self.canvas.delete("pause")
+        # Remove the pause screen
+        self.canvas.delete("pause")
 
     def switch_to_options(self):
         """
@@ -765,6 +3809,7 @@ class RoboJump:
         # Reset the canvas and update the main menu state
         self.reset_canvas()
         self.main_menu = False
+        self.screen = self.switch_to_options
 
         # Display the options screen background
         self.canvas.create_image(
@@ -778,7 +3823,7 @@ class RoboJump:
             command=self.init_main_menu,
             bd=0,
         )
-        menu_btn.place(x=144, y=523)
+        self.place(menu_btn, 144, 523)
         self.buttons.append(menu_btn)
 
         # Create and place buttons for changing key bindings
@@ -789,7 +3834,7 @@ class RoboJump:
             compound="center",
             command=lambda: self.set_left_keybind(keybind_left),
         )
-        keybind_left.place(x=144, y=182)
+        self.place(keybind_left, 144, 182)
 
         keybind_right = tk.Button(
             self.window,
@@ -798,7 +3843,7 @@ class RoboJump:
             compound="center",
             command=lambda: self.set_right_keybind(keybind_right),
         )
-        keybind_right.place(x=144, y=268)
+        self.place(keybind_right, 144, 268)
 
         keybind_boss_key = tk.Button(
             self.window,
@@ -807,7 +3852,7 @@ class RoboJump:
             compound="center",
             command=lambda: self.set_boss_keybind(keybind_boss_key),
         )
-        keybind_boss_key.place(x=144, y=353)
+        self.place(keybind_boss_key, 144, 353)
 
         keybind_jetpack_key = tk.Button(
             self.window,
@@ -816,7 +3861,7 @@ class RoboJump:
             compound="center",
             command=lambda: self.set_jetpack_keybind(keybind_jetpack_key),
         )
-        keybind_jetpack_key.place(x=144, y=438)
+        self.place(keybind_jetpack_key, 144, 438)
 
         # Append the buttons to the list for management
         self.buttons.append(keybind_right)
@@ -837,14 +3882,18 @@ class RoboJump:
         """
         if direction == "left":
             self.left_bind = event.keysym
-            self.window.bind(f"<{self.left_bind}>", self.move_left)
-            self.window.bind(f"<KeyRelease-{self.left_bind}>", self.stop_move)
+            self.window.bind(f"<{self.left_bind}>", self.hold_key)
+            self.window.bind(
+                f"<KeyRelease-{self.left_bind}>", self.release_key
+            )
             button.configure(text=f"Move Left: {self.left_bind}")
 
         elif direction == "right":
             self.right_bind = event.keysym
-            self.window.bind(f"<{self.right_bind}>", self.move_right)
-            self.window.bind(f"<KeyRelease-{self.right_bind}>", self.stop_move)
+            self.window.bind(f"<{self.right_bind}>", self.hold_key)
+            self.window.bind(
+                f"<KeyRelease-{self.right_bind}>", self.release_key
+            )
             button.configure(text=f"Move Right: {self.right_bind}")
 
         elif direction == "boss":
@@ -854,7 +3903,7 @@ class RoboJump:
 
         elif direction == "jetpack":
             self.jetpack_bind = event.keysym
-            self.window.bind(f"<{self.jetpack_bind}>", self.deploy_jet_pack)
+            self.window.bind(f"<{self.jetpack_bind}>", self.tap_key)
             button.configure(text=f"Jetpack Key: {self.jetpack_bind}")
 
         # Unbind the keypress event after a key has been set
@@ -919,40 +3968,32 @@ class RoboJump:
             "<KeyPress>", lambda event: self.key_press(event, "right", button)
         )
 
-    def move_left(self, event):
+    def hold_key(self, event):
         """
-        Moves the player left and updates the player's image.
+        Records a movement key as held in the key-state table.
 
         Args:
-            event: The event triggered by the left key press.
+            event: The event triggered by the key press.
         """
-        self.player_x_velocity = -HORIZONTAL_STRENGTH
-        self.canvas.itemconfig("player", image=self.player_left_image)
+        self.input.key_down(event.keysym)
 
-    def move_right(self, event):
+    def release_key(self, event):
         """
-        Moves the player right and updates the player's image.
+        Records a movement key as released in the key-state table.
 
         Args:
-            event: The event triggered by the right key press.
+            event: The event triggered by the key release.
         """
-        self.player_x_velocity = HORIZONTAL_STRENGTH
-        self.canvas.itemconfig("player", image=self.player_right_image)
+        self.input.key_up(event.keysym)
 
-    def stop_move(self, event):
+    def tap_key(self, event):
         """
-        Stops the player's horizontal movement.
+        Records a one-off key press, such as the jetpack toggle.
 
         Args:
-            event: The event triggered when the player releases
-            the left or right key.
+            event: The event triggered by the key press.
         """
-        self.player_x_velocity = 0
-
-    def deploy_jet_pack(self, event):
-        """Toggles the jetpack and power-up states."""
-        self.is_jetpack_on = not self.is_jetpack_on
-        self.is_power_up_on = not self.is_power_up_on
+        self.input.tap(event.keysym)
 
     def display_work_screen(self, event):
         """
@@ -965,10 +4006,12 @@ class RoboJump:
         self.window.title("File Manager")
 
         self.boss_key_pressed = not self.boss_key_pressed
+        self.telemetry.emit("boss_key", shown=self.boss_key_pressed)
 
         if self.boss_key_pressed:
             # Create and display the work-related image
-            self.boss = tk.Canvas(self.window, height=HEIGHT, width=WIDTH)
+            width, height = self.scaled(WIDTH, HEIGHT)
+            self.boss = tk.Canvas(self.window, height=height, width=width)
             self.boss.place(x=0, y=0, anchor="nw")
             self.boss.create_image(
                 0, 0, anchor="nw", image=self.boss_image, tags=("boss")
@@ -986,6 +4029,7 @@ class RoboJump:
         # Reset the canvas and set the main menu state to False
         self.reset_canvas()
         self.main_menu = False
+        self.screen = self.switch_to_leaderboard
 
         # Display the leaderboard background image
         self.canvas.create_image(
@@ -998,7 +4042,7 @@ class RoboJump:
             command=self.init_main_menu,
             bd=0,
         )
-        menu_btn.place(x=144, y=523)
+        self.place(menu_btn, 144, 523)
         self.buttons.append(menu_btn)
 
         # Display the leaderboard scores
@@ -1013,6 +4057,18 @@ class RoboJump:
         with open(LEADERBOARD_FILE, "r") as f:
             return [x.strip() for x in f.readlines()]
 
+    def leaderboard_scores(self):
+        """
+        Returns the shared leaderboard's cached top scores, in the same
+        "name: score" form as the leaderboard file, or the file's scores
+        if there is no shared leaderboard or nothing has been fetched yet.
+        """
+        if self.leaderboard is not None:
+            top = self.leaderboard.top()
+            if top:
+                return [f"{name}: {score}" for name, score in top]
+        return self.read_scores()
+
     def update_score(self):
         """
         Updates the leaderboard with the current player's score.
@@ -1024,7 +4080,7 @@ class RoboJump:
         # Retrieve all current scores from the leaderboard file
         all_scores = self.read_scores()
 
-        all_scores.append(f"{self.name}: {self.score}")
+        all_scores.append(f"{self.name}: {self.world.score}")
 
         # Sort the scores in descending order based on the key (score value)
         all_scores.sort(
@@ -1039,6 +4095,40 @@ class RoboJump:
             for entry in all_scores:
                 f.write(entry + "\n")
 
+    def save_recording(self):
+        """
+        Saves the recording of the run that just ended to RECORDINGS_DIR,
+        then deletes all but the RECORDINGS_KEPT highest scoring ones.
+        """
+        if self.recording is None:
+            return
+        self.recording.name = self.name
+        self.recording.score = self.world.score
+
+        # The run's trace is saved beside it, for racing its ghost
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
+        stem = os.path.join(RECORDINGS_DIR, str(time.time_ns()))
+        self.recording.save(f"{stem}.json")
+        self.trace.save(f"{stem}.trace", self.name, self.world.score)
+        self.recording = None
+        self.trace = None
+
+        scored = []
+        for filename in os.listdir(RECORDINGS_DIR):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(RECORDINGS_DIR, filename)
+            try:
+                scored.append((Recording.load(path).score or 0, path))
+            except (OSError, ValueError, KeyError):
+                continue
+        scored.sort(reverse=True)
+        for _, path in scored[RECORDINGS_KEPT:]:
+            os.remove(path)
+            trace = path[: -len(".json")] + ".trace"
+            if os.path.exists(trace):
+                os.remove(trace)
+
     def display_scores(self):
         """
         Displays the top scores on the canvas.
@@ -1046,7 +4136,7 @@ class RoboJump:
         The method retrieves the scores from the leaderboard
         file and displays them on the canvas, one score at a time.
         """
-        scores = self.read_scores()
+        scores = self.leaderboard_scores()
 
         # Initial vertical position for the first score
         y_pos = 200
@@ -1054,8 +4144,7 @@ class RoboJump:
         # Loop through each score and display it on the canvas
         for i, score in enumerate(scores):
             self.canvas.create_text(
-                244,
-                y_pos,
+                *self.scaled(244, y_pos),
                 font=self.custom_font,
                 text=f"{i+1}. {score}",
                 fill="white",
@@ -1078,11 +4167,6 @@ class RoboJump:
             self.main_menu = game_state["main_menu"]
             self.playing = game_state["playing"]
             self.paused = game_state["paused"]
-            self.player_x_pos = game_state["player_x_pos"]
-            self.player_y_pos = game_state["player_y_pos"]
-            self.player_y_velocity = game_state["player_y_velocity"]
-            self.player_x_velocity = game_state["player_x_velocity"]
-            self.score = game_state["score"]
 
             # Restore control key bindings
             self.left_bind = game_state["left_bind"]
@@ -1093,26 +4177,22 @@ class RoboJump:
             # Restore other game settings
             self.name = game_state["name"]
             self.boss_key_pressed = game_state["boss_key_pressed"]
-            self.player_heights = game_state["player_heights"]
-            self.is_jetpack_on = game_state["is_jetpack_on"]
-            self.is_power_up_on = game_state["is_power_up_on"]
 
-            # Restore level and tile data
-            self.tile_y_pos = game_state["tile_y_pos"]
-            self.space_between = game_state["space_between"]
-            self.difficulty_level = game_state["difficulty_level"]
+            # Restore the player, score and level data
+            self.world.load(game_state)
+            self.open_from_save = True
 
             # Bind the controls to the loaded key bindings
-            self.window.bind(f"<{self.left_bind}>", self.move_left)
-            self.window.bind(f"<{self.right_bind}>", self.move_right)
+            self.window.bind(f"<{self.left_bind}>", self.hold_key)
+            self.window.bind(f"<{self.right_bind}>", self.hold_key)
             self.window.bind(
                 f"<KeyRelease-{self.left_bind}>",
-                self.stop_move)
+                self.release_key)
             self.window.bind(
                 f"<KeyRelease-{self.right_bind}>",
-                self.stop_move)
+                self.release_key)
             self.window.bind("<b>", self.display_work_screen)
-            self.window.bind("<j>", self.deploy_jet_pack)
+            self.window.bind(f"<{self.jetpack_bind}>", self.tap_key)
 
         except FileNotFoundError:
             print(
@@ -1122,8 +4202,7 @@ class RoboJump:
             print("The saved file has been corrupted")
             # Handle corrupted file
 
-        # Mark as opened from a save and start the game
-        self.open_from_save = True
+        # Start the game, from the save if it was loaded
         self.switch_to_play()
         print("Going to saved games")
 
@@ -1138,24 +4217,15 @@ class RoboJump:
             "main_menu": self.main_menu,
             "playing": self.playing,
             "paused": self.paused,
-            "player_x_pos": self.player_x_pos,
-            "player_y_pos": self.player_y_pos,
-            "player_y_velocity": self.player_y_velocity,
-            "player_x_velocity": self.player_x_velocity,
-            "score": self.score,
             "left_bind": self.left_bind,
             "right_bind": self.right_bind,
             "boss_bind": self.boss_bind,
             "jetpack_bind": self.jetpack_bind,
             "name": self.name,
             "boss_key_pressed": self.boss_key_pressed,
-            "player_heights": self.player_heights,
-            "is_jetpack_on": self.is_jetpack_on,
-            "is_power_up_on": self.is_power_up_on,
-            "tile_y_pos": self.tile_y_pos,
-            "space_between": self.space_between,
-            "difficulty_level": self.difficulty_level,
         }
+        game_state.update(self.world.state())
+        self.world.emit("save")
 
         # Write the game state to the saved file
         with open(SAVE_FILE, "w") as f:
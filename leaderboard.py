@@ -0,0 +1,438 @@
+"""
+Shared leaderboard for RoboJump cabinets.
+
+A small HTTP service keeps the top scores of every cabinet pointed at it,
+and LeaderboardClient is the game's side of it. The client never makes the
+game wait: scores are queued and sent in batches from a background thread
+over one kept-alive connection, retried with backoff, and kept in an outbox
+file while the service is down. Reads of the top scores come from a cache
+that the same thread refreshes once it is older than its TTL.
+
+Example:
+    python leaderboard.py serve --port 8765
+    python leaderboard.py play http://localhost:8765
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_PORT = 8765
+DATA_FILE = "leaderboard_service.json"
+OUTBOX_FILE = "leaderboard_outbox.json"
+
+# Scores the service keeps, and submission ids it remembers so a retried
+# batch isn't counted twice
+SCORES_KEPT = 100
+IDS_KEPT = 10000
+NAME_LENGTH = 16
+
+# Client: scores per request, seconds before a request times out, attempts
+# per batch with the delay doubling from RETRY_DELAY, and seconds between
+# tries while the service is down
+BATCH_SIZE = 50
+REQUEST_TIMEOUT = 2.0
+RETRIES = 3
+RETRY_DELAY = 0.25
+RETRY_INTERVAL = 10.0
+
+# Client: scores fetched for the cache and seconds before it is refreshed
+TOP_SHOWN = 5
+CACHE_TTL = 30.0
+
+
+class ScoreStore:
+    """
+    Top scores of the service, saved to a JSON file after every change so
+    they survive a restart.
+    """
+
+    def __init__(self, path=DATA_FILE, kept=SCORES_KEPT):
+        """
+        Loads the scores saved at `path`, if any.
+
+        Args:
+            path (str): File the scores are kept in, None to keep them in
+            memory only.
+            kept (int): Number of scores kept.
+        """
+        self.path = path
+        self.kept = kept
+        self.scores = []
+        self.ids = deque(maxlen=IDS_KEPT)
+        self.lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            self.scores = [tuple(entry) for entry in data["scores"]]
+            self.ids.extend(data["ids"])
+        self.seen = set(self.ids)
+
+    def add(self, entries):
+        """
+        Adds submitted scores, skipping ids already added and invalid
+        entries.
+
+        Args:
+            entries (list): Dicts with "id", "name" and "score".
+
+        Returns:
+            int: Number of scores added.
+        """
+        added = 0
+        with self.lock:
+            for entry in entries:
+                try:
+                    entry_id = str(entry["id"])
+                    name = str(entry["name"])[:NAME_LENGTH]
+                    score = float(entry["score"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if entry_id in self.seen or not math.isfinite(score):
+                    continue
+
+                # Forget the oldest id once the deque is full
+                if len(self.ids) == self.ids.maxlen:
+                    self.seen.discard(self.ids[0])
+                self.ids.append(entry_id)
+                self.seen.add(entry_id)
+                self.scores.append((name, score))
+                added += 1
+
+            if added:
+                self.scores.sort(key=lambda entry: entry[1], reverse=True)
+                del self.scores[self.kept :]
+                self.save()
+        return added
+
+    def top(self, count):
+        """Returns the best `count` scores as (name, score), best first."""
+        with self.lock:
+            return self.scores[:count]
+
+    def save(self):
+        """Writes the scores out, replacing the file in one step."""
+        if self.path is None:
+            return
+        temp = f"{self.path}.tmp"
+        with open(temp, "w") as f:
+            json.dump({"scores": self.scores, "ids": list(self.ids)}, f)
+        os.replace(temp, self.path)
+
+
+class LeaderboardHandler(BaseHTTPRequestHandler):
+    """
+    Serves GET /top?count=N and POST /scores. Connections are kept alive,
+    so a client sends all its requests over one.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/top":
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            count = int(parse_qs(url.query).get("count", [TOP_SHOWN])[0])
+        except ValueError:
+            self.send_json(400, {"error": "count must be a number"})
+            return
+        self.send_json(200, self.server.store.top(max(count, 0)))
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/scores":
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            entries = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_json(400, {"error": "body must be JSON"})
+            return
+        if not isinstance(entries, list):
+            self.send_json(400, {"error": "body must be a list of scores"})
+            return
+        self.send_json(200, {"added": self.server.store.add(entries)})
+
+    def send_json(self, status, data):
+        """Sends a JSON response."""
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Cabinets post after every run, so don't log each request
+        pass
+
+
+class LeaderboardServer(ThreadingHTTPServer):
+    """The leaderboard service, one thread per connection."""
+
+    daemon_threads = True
+
+    def __init__(self, address, store):
+        """
+        Args:
+            address (tuple): (host, port) to listen on, port 0 for any.
+            store (ScoreStore): Where the scores are kept.
+        """
+        super().__init__(address, LeaderboardHandler)
+        self.store = store
+
+
+class LeaderboardClient:
+    """
+    The game's connection to the leaderboard service.
+
+    `submit` and `top` only touch a deque and a cached list, so they never
+    block. A worker thread does all the network traffic. The game thread
+    only appends to `queue` and only the worker pops from it, like the
+    Telemetry buffer, so neither side takes a lock.
+    """
+
+    def __init__(self, url, outbox=OUTBOX_FILE, ttl=CACHE_TTL):
+        """
+        Args:
+            url (str): Service address, such as "http://localhost:8765".
+            outbox (str): File unsent scores are kept in until the service
+            takes them.
+            ttl (float): Seconds before cached top scores are refreshed.
+        """
+        url = urlsplit(url)
+        self.host = url.hostname
+        self.port = url.port or DEFAULT_PORT
+        self.outbox = outbox
+        self.ttl = ttl
+
+        self.queue = deque()
+        self.cache = []
+        self.cache_time = None
+        self.refresh = True
+
+        # Only the worker touches these
+        self.unsent = []
+        self.connection = None
+        self.retry_at = 0.0
+
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Starts the worker, which first sends any scores left unsent."""
+        self.thread = threading.Thread(
+            target=self.run, name="leaderboard", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, name, score):
+        """
+        Queues a score for the service.
+
+        Args:
+            name (str): Player's name.
+            score (float): Final score of the run.
+        """
+        # The id lets the service ignore a batch it already took
+        self.queue.append(
+            {"id": uuid.uuid4().hex, "name": name, "score": score}
+        )
+        self.wake.set()
+
+    def top(self):
+        """
+        Returns the cached top scores as (name, score), best first, and
+        asks the worker for fresh ones if they are older than the TTL.
+
+        Returns:
+            list: The cached scores, empty until the first fetch succeeds.
+        """
+        if (
+            self.cache_time is None
+            or time.monotonic() - self.cache_time > self.ttl
+        ):
+            self.refresh = True
+            self.wake.set()
+        return self.cache
+
+    def close(self, timeout=REQUEST_TIMEOUT):
+        """
+        Stops the worker after one last try to send what is queued, anything
+        still unsent stays in the outbox.
+
+        Args:
+            timeout (float): Seconds to wait for the worker.
+        """
+        self.stopping.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def run(self):
+        """Worker thread."""
+        self.load_outbox()
+        while True:
+            # Cleared before the work, so a score queued meanwhile wakes it
+            self.wake.clear()
+            stopping = self.stopping.is_set()
+            self.drain()
+            if self.unsent and (stopping or time.monotonic() >= self.retry_at):
+                self.send()
+            if self.refresh and not stopping:
+                self.fetch_top()
+            if stopping:
+                break
+
+            self.wake.wait(RETRY_INTERVAL if self.unsent else None)
+
+        if self.connection is not None:
+            self.connection.close()
+
+    def drain(self):
+        """Moves queued scores to the unsent list, saving them first."""
+        if not self.queue:
+            return
+        for _ in range(len(self.queue)):
+            self.unsent.append(self.queue.popleft())
+        self.save_outbox()
+
+    def send(self):
+        """Sends the unsent scores in batches until the service fails."""
+        while self.unsent:
+            batch = self.unsent[:BATCH_SIZE]
+            response = self.request("POST", "/scores", batch)
+            if response is None:
+                self.retry_at = time.monotonic() + RETRY_INTERVAL
+                break
+
+            # A rejected batch would be rejected again, so it is dropped
+            status, _ = response
+            if status != 200:
+                print(f"Leaderboard rejected {len(batch)} scores: {status}")
+            del self.unsent[: len(batch)]
+            self.refresh = True
+        self.save_outbox()
+
+    def fetch_top(self):
+        """Refreshes the cached top scores, keeping the old ones on failure."""
+        self.refresh = False
+        response = self.request("GET", f"/top?count={TOP_SHOWN}")
+        self.cache_time = time.monotonic()
+        if response is not None and response[0] == 200:
+            self.cache = [(name, score) for name, score in response[1]]
+
+    def request(self, method, path, body=None):
+        """
+        Makes a request over the kept-alive connection, reconnecting and
+        retrying with backoff if it fails.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path and query.
+            body: JSON-friendly request body, if any.
+
+        Returns:
+            tuple: (status, decoded JSON body), or None if the service
+            couldn't be reached or kept failing.
+        """
+        headers = {}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+
+        for attempt in range(RETRIES):
+            # Back off between attempts, giving up early when closing
+            delay = RETRY_DELAY * 2 ** (attempt - 1)
+            if attempt and self.stopping.wait(delay):
+                break
+            try:
+                if self.connection is None:
+                    self.connection = http.client.HTTPConnection(
+                        self.host, self.port, timeout=REQUEST_TIMEOUT
+                    )
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                # Start over on a fresh connection
+                self.connection.close()
+                self.connection = None
+                continue
+
+            if response.status >= 500:
+                continue
+            try:
+                return response.status, json.loads(data)
+            except ValueError:
+                return response.status, None
+        return None
+
+    def load_outbox(self):
+        """Picks up scores a previous session couldn't send."""
+        try:
+            with open(self.outbox, "r") as f:
+                self.unsent = json.load(f)
+        except (OSError, ValueError):
+            self.unsent = []
+
+    def save_outbox(self):
+        """Writes the unsent scores out, or removes the outbox if none."""
+        try:
+            if not self.unsent:
+                if os.path.exists(self.outbox):
+                    os.remove(self.outbox)
+                return
+            temp = f"{self.outbox}.tmp"
+            with open(temp, "w") as f:
+                json.dump(self.unsent, f)
+            os.replace(temp, self.outbox)
+        except OSError as error:
+            print(f"Leaderboard outbox not saved: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the leaderboard service")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--data", default=DATA_FILE,
+                       help="file the scores are kept in")
+
+    play = commands.add_parser("play", help="play using the service")
+    play.add_argument("url", help="service address, e.g. http://host:8765")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        server = LeaderboardServer(
+            (args.host, args.port), ScoreStore(args.data)
+        )
+        print(f"Leaderboard on port {server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        server.server_close()
+    else:
+        from game_solution import RoboJump
+
+        RoboJump(leaderboard=LeaderboardClient(args.url))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
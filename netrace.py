@@ -0,0 +1,423 @@
+"""
+LAN race mode for RoboJump.
+
+A small asyncio server starts a race once enough players have joined and
+hands every client the same seed and physics, so all of them play the same
+level.
+Clients only send their per-tick actions; the server replays each player's
+run from those actions and sends every client compact snapshots of where
+everyone is. Snapshots are delta-encoded against the previous one sent on
+the same connection, which keeps traffic to a few hundred bytes a second
+per player.
+
+Example:
+    python netrace.py serve --players 2
+    python netrace.py join localhost:5555 --name Ada
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import struct
+import sys
+import threading
+from collections import deque
+
+from game_solution import CONFIG_FILE, World, load_config, physics
+
+DEFAULT_PORT = 5555
+
+# Seconds between snapshots from the server and input batches from clients
+SNAPSHOT_INTERVAL = 0.05
+SEND_INTERVAL = 0.05
+
+# Message types, each message is a 2-byte length then a type byte
+MSG_HELLO = 1  # client: player name
+MSG_START = 2  # server: JSON with the player's id, the seed and all names
+MSG_INPUTS = 3  # client: first tick, then one action byte per tick
+MSG_SNAPSHOT = 4  # server: delta-encoded player states
+
+# Bits of a snapshot entry's mask: which fields follow, whether the player
+# is still running, and whether values are absolute int32s, not int16 deltas
+FIELD_X = 1
+FIELD_ALTITUDE = 2
+FIELD_SCORE = 4
+FLAG_ALIVE = 8
+FLAG_FULL = 16
+
+ENTRY = struct.Struct(">BB")
+DELTA = struct.Struct(">h")
+FULL = struct.Struct(">i")
+INPUTS = struct.Struct(">I")
+
+
+def player_state(world):
+    """Returns (x, altitude, score, alive) of a world, as whole numbers."""
+    return (
+        round(world.player_x_pos),
+        round(world.altitude()),
+        round(world.score),
+        not world.game_over,
+    )
+
+
+def encode_snapshot(states, previous):
+    """
+    Delta-encodes player states against the ones last sent.
+
+    Args:
+        states (dict): Player id to (x, altitude, score, alive).
+        previous (dict): The states the receiver already has, updated to
+        `states` in place.
+
+    Returns:
+        bytes: The snapshot payload, empty if nothing changed.
+    """
+    out = bytearray()
+    for player, state in states.items():
+        old = previous.get(player)
+        if old == state:
+            continue
+
+        mask = FLAG_ALIVE if state[3] else 0
+        values = []
+        if old is None:
+            mask |= FLAG_FULL | FIELD_X | FIELD_ALTITUDE | FIELD_SCORE
+            values = list(state[:3])
+        else:
+            deltas = [new - was for new, was in zip(state[:3], old[:3])]
+            if any(not -32768 <= delta <= 32767 for delta in deltas):
+                mask |= FLAG_FULL
+            for bit, delta, value in zip(
+                (FIELD_X, FIELD_ALTITUDE, FIELD_SCORE), deltas, state
+            ):
+                if delta:
+                    mask |= bit
+                    values.append(value if mask & FLAG_FULL else delta)
+
+        out += ENTRY.pack(player, mask)
+        packer = FULL if mask & FLAG_FULL else DELTA
+        for value in values:
+            out += packer.pack(value)
+        previous[player] = state
+    return bytes(out)
+
+
+def decode_snapshot(payload, states):
+    """
+    Applies a snapshot payload to the receiver's copy of the states.
+
+    Args:
+        payload (bytes): As made by `encode_snapshot`.
+        states (dict): Player id to (x, altitude, score, alive), updated in
+        place.
+    """
+    offset = 0
+    while offset < len(payload):
+        player, mask = ENTRY.unpack_from(payload, offset)
+        offset += ENTRY.size
+        packer = FULL if mask & FLAG_FULL else DELTA
+
+        state = list(states.get(player, (0, 0, 0, True)))
+        for index, bit in enumerate((FIELD_X, FIELD_ALTITUDE, FIELD_SCORE)):
+            if mask & bit:
+                (value,) = packer.unpack_from(payload, offset)
+                offset += packer.size
+                if not mask & FLAG_FULL:
+                    value += state[index]
+                state[index] = value
+        state[3] = bool(mask & FLAG_ALIVE)
+        states[player] = tuple(state)
+
+
+async def read_message(reader):
+    """Reads one message, returning (type, payload)."""
+    header = await reader.readexactly(3)
+    length, kind = struct.unpack(">HB", header)
+    return kind, await reader.readexactly(length)
+
+
+def write_message(writer, kind, payload=b""):
+    """Queues one message on a stream, without waiting for it to send."""
+    writer.write(struct.pack(">HB", len(payload), kind) + payload)
+
+
+class RaceServer:
+    """
+    Runs one race. Waits for `players` clients, starts them all on the same
+    seed, replays every player's run from their actions and sends everyone
+    snapshots until all runs are over.
+    """
+
+    def __init__(
+        self, players, host="0.0.0.0", port=DEFAULT_PORT, seed=None
+    ):
+        """
+        Args:
+            players (int): Number of players the race waits for.
+            host (str): Address to listen on.
+            port (int): Port to listen on.
+            seed (int): Level seed, random if None.
+        """
+        self.players = players
+        self.host = host
+        self.port = port
+        self.seed = random.getrandbits(32) if seed is None else seed
+
+        self.names = []
+        self.worlds = []
+        self.writers = []
+        self.started = None
+
+    async def serve(self):
+        """Runs the race to the end."""
+        self.started = asyncio.Event()
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"Waiting for {self.players} players on port {self.port}")
+
+        async with server:
+            await self.started.wait()
+            print("Race started:", ", ".join(self.names))
+            await self.broadcast()
+
+        for writer in self.writers:
+            writer.close()
+        print(
+            "Results:",
+            ", ".join(
+                f"{name} {world.score:.0f}"
+                for name, world in zip(self.names, self.worlds)
+            ),
+        )
+
+    async def handle(self, reader, writer):
+        """Looks after one client connection."""
+        try:
+            kind, payload = await read_message(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        if kind != MSG_HELLO or len(self.names) >= self.players:
+            writer.close()
+            return
+
+        player = len(self.names)
+        self.names.append(payload.decode(errors="replace")[:16])
+        self.worlds.append(World(self.seed))
+        self.writers.append(writer)
+
+        # Everyone starts together once the race is full
+        if len(self.names) == self.players:
+            for index, other in enumerate(self.writers):
+                start = {
+                    "player": index,
+                    "seed": self.seed,
+                    "difficulty": self.worlds[0].difficulty,
+                    "physics": physics(),
+                    "names": self.names,
+                }
+                write_message(other, MSG_START, json.dumps(start).encode())
+            self.started.set()
+
+        world = self.worlds[player]
+        try:
+            while not world.game_over:
+                kind, payload = await read_message(reader)
+                if kind != MSG_INPUTS:
+                    continue
+
+                # Actions arrive in order, so skip any already replayed
+                (first,) = INPUTS.unpack_from(payload)
+                world.replay(payload[INPUTS.size + world.ticks - first:])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # A player who leaves is out of the race
+            world.end("left")
+
+    async def broadcast(self):
+        """Sends snapshots to every client until all runs are over."""
+        previous = [{} for _ in self.writers]
+        while True:
+            states = {
+                player: player_state(world)
+                for player, world in enumerate(self.worlds)
+            }
+            for writer, sent in zip(self.writers, previous):
+                payload = encode_snapshot(states, sent)
+                if payload and not writer.is_closing():
+                    write_message(writer, MSG_SNAPSHOT, payload)
+
+            if all(world.game_over for world in self.worlds):
+                break
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+
+        for writer in self.writers:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+
+class RaceClient:
+    """
+    Connection to a race server, run on its own thread with its own event
+    loop so the game loop never waits on the network.
+
+    The game hands over its actions with `send`, which only appends to a
+    deque, and reads `latest`, which the network thread replaces with a
+    new dict for each snapshot. Neither side takes a lock.
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, name="Player"):
+        """
+        Args:
+            host (str): Server address.
+            port (int): Server port.
+            name (str): Name shown to the other players.
+        """
+        self.host = host
+        self.port = port
+        self.name = name
+
+        # Set once the race starts, seed last as it marks the client ready
+        self.player = None
+        self.names = []
+        self.difficulty = None
+        self.physics = None
+        self.seed = None
+
+        self.latest = {}
+        self.error = None
+        self.outbox = deque()
+        self.sent = 0
+        self.sent_bytes = 0
+        self.received_bytes = 0
+
+        self.loop = None
+        self.task = None
+        self.stopping = False
+
+    def start(self):
+        """Connects in the background."""
+        threading.Thread(
+            target=self.run, name="race-client", daemon=True
+        ).start()
+
+    def send(self, action):
+        """Queues the action of the next tick for the server."""
+        self.outbox.append(action)
+
+    def close(self):
+        """
+        Disconnects without waiting for the network thread, which counts as
+        leaving the race if the player is still running.
+        """
+        self.stopping = True
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self.task.cancel)
+            except RuntimeError:
+                # The loop closed in the meantime
+                pass
+
+    def run(self):
+        """Network thread."""
+        try:
+            asyncio.run(self.connect())
+        except asyncio.CancelledError:
+            pass
+        except (OSError, asyncio.IncompleteReadError, ValueError) as error:
+            if not self.stopping:
+                self.error = str(error) or type(error).__name__
+
+    async def connect(self):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        if self.stopping:
+            return
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        write_message(writer, MSG_HELLO, self.name.encode())
+
+        kind, payload = await read_message(reader)
+        if kind != MSG_START:
+            raise ValueError("server did not start the race")
+        start = json.loads(payload)
+        self.player = start["player"]
+        self.names = start["names"]
+        self.difficulty = start["difficulty"]
+        self.physics = start["physics"]
+        self.seed = start["seed"]
+
+        receiver = asyncio.create_task(self.receive(reader))
+        try:
+            while not self.stopping and not receiver.done():
+                self.flush(writer)
+                await writer.drain()
+                await asyncio.sleep(SEND_INTERVAL)
+            self.flush(writer)
+        finally:
+            receiver.cancel()
+            writer.close()
+
+        # Raises why the server went away, unless the player left
+        if not self.stopping:
+            receiver.result()
+
+    def flush(self, writer):
+        """Sends the actions queued since the last batch."""
+        count = len(self.outbox)
+        if not count:
+            return
+        actions = bytes(self.outbox.popleft() for _ in range(count))
+        payload = INPUTS.pack(self.sent) + actions
+        write_message(writer, MSG_INPUTS, payload)
+        self.sent += count
+        self.sent_bytes += len(payload) + 3
+
+    async def receive(self, reader):
+        states = {}
+        while True:
+            try:
+                kind, payload = await read_message(reader)
+            except asyncio.IncompleteReadError:
+                # The server hangs up once nobody is still running
+                if states and not any(state[3] for state in states.values()):
+                    return
+                raise
+            self.received_bytes += len(payload) + 3
+            if kind == MSG_SNAPSHOT:
+                decode_snapshot(payload, states)
+                self.latest = dict(states)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run a race server")
+    serve.add_argument("--players", type=int, default=2)
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--seed", type=int, default=None)
+    serve.add_argument("--config", default=CONFIG_FILE,
+                       help="physics and difficulty for everyone")
+
+    join = commands.add_parser("join", help="join a race in the game")
+    join.add_argument("address", help="server as host or host:port")
+    join.add_argument("--name", default="Player")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        load_config(args.config)
+        server = RaceServer(args.players, args.host, args.port, args.seed)
+        asyncio.run(server.serve())
+    else:
+        from game_solution import RoboJump
+
+        host, _, port = args.address.partition(":")
+        RoboJump(lan=RaceClient(host, int(port or DEFAULT_PORT), args.name))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Offscreen rendering of RoboJump into raw RGB frame buffers.
+
+Works without a display or any imaging library: the sprites in files/ are
+decoded with a small PNG reader and composited in memory, so screenshots
+and visual regression images can be made on headless CI boxes.
+"""
+
+import struct
+import zlib
+
+from game_solution import (
+    HEIGHT,
+    KIND_ENEMY,
+    KIND_TILE,
+    WIDTH,
+    Renderer,
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Sprite files used for each part of the play scene
+SPRITE_FILES = {
+    "background": "background.png",
+    "top": "top.png",
+    "player_left": "bird_left.png",
+    "player_right": "bird_right.png",
+    KIND_TILE: "regular_tile.png",
+    KIND_ENEMY: "enemy.png",
+}
+
+
+def read_png(path):
+    """
+    Decodes an 8-bit, non-interlaced RGB or RGBA PNG file.
+
+    Args:
+        path (str): File to read.
+
+    Returns:
+        tuple: (width, height, channels, pixels) where pixels is a
+        bytearray of rows, top to bottom, `channels` bytes per pixel.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError(f"{path} is not a PNG file")
+
+    compressed = bytearray()
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        length, kind = struct.unpack(">I4s", data[offset: offset + 8])
+        body = data[offset + 8: offset + 8 + length]
+        if kind == b"IHDR":
+            width, height, depth, colour, _, _, interlace = struct.unpack(
+                ">IIBBBBB", body
+            )
+        elif kind == b"IDAT":
+            compressed += body
+        elif kind == b"IEND":
+            break
+        offset += length + 12
+
+    if depth != 8 or colour not in (2, 6) or interlace:
+        raise ValueError(f"{path} is not an 8-bit RGB or RGBA PNG")
+
+    channels = 3 if colour == 2 else 4
+    stride = width * channels
+    raw = zlib.decompress(bytes(compressed))
+    pixels = bytearray(stride * height)
+    previous = bytearray(stride)
+
+    for y in range(height):
+        start = y * (stride + 1)
+        kind = raw[start]
+        row = bytearray(raw[start + 1: start + 1 + stride])
+
+        # Undo the row filter, see the PNG specification section 9
+        if kind == 1:
+            for i in range(channels, stride):
+                row[i] = (row[i] + row[i - channels]) & 0xFF
+        elif kind == 2:
+            for i in range(stride):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif kind == 3:
+            for i in range(stride):
+                left = row[i - channels] if i >= channels else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(stride):
+                a = row[i - channels] if i >= channels else 0
+                b = previous[i]
+                c = previous[i - channels] if i >= channels else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                if pa <= pb and pa <= pc:
+                    predictor = a
+                elif pb <= pc:
+                    predictor = b
+                else:
+                    predictor = c
+                row[i] = (row[i] + predictor) & 0xFF
+
+        pixels[y * stride: (y + 1) * stride] = row
+        previous = row
+
+    return width, height, channels, pixels
+
+
+def blend_tables(red, green, blue, alpha):
+    """
+    Builds lookup tables mapping a background channel value to its value
+    with the given colour drawn over it, for use with bytes.translate.
+
+    Returns:
+        tuple: One 256-byte table for each of red, green and blue.
+    """
+    return tuple(
+        bytes(
+            (value * alpha + below * (255 - alpha)) // 255
+            for below in range(256)
+        )
+        for value in (red, green, blue)
+    )
+
+
+class Sprite:
+    """
+    Decoded sprite ready for fast compositing.
+
+    Each row is stored as runs of opaque pixels, copied with one slice
+    assignment, and runs of one partly transparent colour, blended a
+    channel at a time through translate tables. Fully transparent pixels
+    are skipped altogether.
+    """
+
+    __slots__ = ("width", "height", "rgb", "rows")
+
+    def __init__(self, path, tables=None):
+        """
+        Loads and prepares a sprite.
+
+        Args:
+            path (str): PNG file to load.
+            tables (dict): Blend tables by RGBA colour, shared between
+            sprites to save rebuilding them.
+        """
+        self.width, self.height, channels, pixels = read_png(path)
+        self.rgb = bytearray(self.width * self.height * 3)
+        self.rows = []
+        tables = {} if tables is None else tables
+
+        for y in range(self.height):
+            opaque = []
+            blended = []
+            run_start = None
+            run_colour = None
+            for x in range(self.width + 1):
+                colour = None
+                if x < self.width:
+                    source = (y * self.width + x) * channels
+                    target = (y * self.width + x) * 3
+                    self.rgb[target: target + 3] = pixels[source: source + 3]
+                    colour = bytes(pixels[source: source + channels])
+                    if channels == 3 or colour[3] == 255:
+                        colour = b"opaque"
+                    elif colour[3] == 0:
+                        colour = None
+
+                if colour == run_colour:
+                    continue
+
+                # The current run ends here
+                if run_colour == b"opaque":
+                    opaque.append((run_start, x))
+                elif run_colour is not None:
+                    if run_colour not in tables:
+                        tables[run_colour] = blend_tables(*run_colour)
+                    blended.append((run_start, x, tables[run_colour]))
+                run_start = x
+                run_colour = colour
+
+            self.rows.append((opaque, blended))
+
+
+class OffscreenRenderer(Renderer):
+    """
+    Renders the play scene into `frame`, a bytearray of packed RGB rows,
+    using the same sprites as the game window. The score text is not drawn.
+    """
+
+    def __init__(self, width=WIDTH, height=HEIGHT, assets="files"):
+        """
+        Loads the sprites and allocates the frame buffer.
+
+        Args:
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+            assets (str): Directory holding the sprite files.
+        """
+        self.width = width
+        self.height = height
+        tables = {}
+        self.sprites = {
+            name: Sprite(f"{assets}/{filename}", tables)
+            for name, filename in SPRITE_FILES.items()
+        }
+        self.frame = bytearray(width * height * 3)
+        self.frames = 0
+
+    def start(self, world):
+        self.draw(world)
+
+    def draw(self, world):
+        self.frames += 1
+        self.blit(self.sprites["background"], 0, 0)
+
+        entities = world.entities
+        for i in range(len(entities)):
+            if entities.in_view(i):
+                self.blit(
+                    self.sprites[entities.kind[i]],
+                    entities.x[i],
+                    entities.y[i],
+                )
+
+        player = "player_left" if world.facing_left else "player_right"
+        self.blit(
+            self.sprites[player], world.player_x_pos, world.player_y_pos
+        )
+        self.blit(self.sprites["top"], 0, 0)
+
+    def blit(self, sprite, x, y):
+        """
+        Composites a sprite onto the frame with its top-left at (x, y),
+        clipped to the frame.
+
+        Args:
+            sprite (Sprite): Sprite to draw.
+            x (float): Left edge, rounded to a whole pixel.
+            y (float): Top edge, rounded to a whole pixel.
+        """
+        x = int(round(x))
+        y = int(round(y))
+        frame = self.frame
+        rgb = sprite.rgb
+        left = max(0, -x)
+        right = min(sprite.width, self.width - x)
+        if left >= right:
+            return
+
+        for row in range(max(0, -y), min(sprite.height, self.height - y)):
+            opaque, blended = sprite.rows[row]
+            source_row = row * sprite.width
+            target_row = (y + row) * self.width + x
+
+            for start, end in opaque:
+                start = max(start, left)
+                end = min(end, right)
+                if start < end:
+                    frame[(target_row + start) * 3: (target_row + end) * 3] = (
+                        rgb[(source_row + start) * 3: (source_row + end) * 3]
+                    )
+
+            for start, end, tables in blended:
+                start = max(start, left)
+                end = min(end, right)
+                if start < end:
+                    first = (target_row + start) * 3
+                    last = (target_row + end) * 3
+                    for channel in range(3):
+                        frame[first + channel: last: 3] = frame[
+                            first + channel: last: 3
+                        ].translate(tables[channel])
+
+    def ppm(self):
+        """Returns the current frame as a binary PPM image."""
+        header = f"P6 {self.width} {self.height} 255\n".encode()
+        return header + bytes(self.frame)
+
+    def png(self, level=1):
+        """
+        Returns the current frame as an RGB PNG image.
+
+        Args:
+            level (int): zlib compression level, low is fast but big.
+        """
+        stride = self.width * 3
+        raw = bytearray()
+        for y in range(self.height):
+            # Every row uses filter type 0, none
+            raw.append(0)
+            raw += self.frame[y * stride: (y + 1) * stride]
+
+        def chunk(kind, body):
+            return (
+                struct.pack(">I", len(body))
+                + kind
+                + body
+                + struct.pack(">I", zlib.crc32(kind + body))
+            )
+
+        # 8 bits per channel, colour type 2 (RGB), no interlacing
+        header = struct.pack(
+            ">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0
+        )
+        return (
+            PNG_SIGNATURE
+            + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(bytes(raw), level))
+            + chunk(b"IEND", b"")
+        )
+
+    def save(self, path):
+        """
+        Writes the current frame to a file, as PNG if the name ends in
+        .png and as binary PPM otherwise.
+
+        Args:
+            path (str): File to write.
+        """
+        with open(path, "wb") as f:
+            f.write(self.png() if path.endswith(".png") else self.ppm())
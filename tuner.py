@@ -0,0 +1,320 @@
+"""
+Offline Monte Carlo tuner for the difficulty ramp.
+
+Plays large numbers of headless games with a scripted or random policy
+across a process pool, sweeping the DIFFICULTY parameters, and reports the
+survival curve, median score and causes of death for each setting. Every
+run is streamed to a JSONL file as it finishes and the summaries are built
+from fixed-size histograms, so memory stays bounded however many runs a
+sweep has.
+
+Example:
+    python tuner.py --runs 100000 --enemy-chance 0.05 0.1 0.2 \\
+        --space-step 25 50 75 --out sweep.jsonl
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+
+from game_solution import (
+    ACTION_LEFT,
+    ACTION_RIGHT,
+    CONFIG_FILE,
+    DIFFICULTY,
+    KIND_TILE,
+    PLAYER_HEIGHT,
+    PLAYER_WIDTH,
+    TILE_WIDTH,
+    WIDTH,
+    Autopilot,
+    World,
+    apply_config,
+    load_config,
+    physics,
+)
+
+RUNS_PER_TASK = 50
+TASKS_PER_WORKER = 8
+SCORE_BIN = 50
+TICK_BIN = 250
+
+
+def idle_policy(rng):
+    """Never presses anything."""
+    return lambda world: 0
+
+
+def random_policy(rng):
+    """Mashes left, right or nothing, holding each for a few ticks."""
+    held = [0]
+
+    def choose(world):
+        if world.ticks % 8 == 0:
+            held[0] = rng.choice((0, ACTION_LEFT, ACTION_RIGHT))
+        return held[0]
+
+    return choose
+
+
+def scripted_policy(rng):
+    """
+    Steers towards the nearest tile on screen in the direction of travel:
+    one above while rising and one below while falling.
+    """
+
+    def choose(world):
+        entities = world.entities
+        centre = world.player_x_pos + PLAYER_WIDTH / 2
+        feet = world.player_y_pos + PLAYER_HEIGHT
+        falling = world.player_y_velocity > 0
+
+        target = None
+        best = None
+        for i in range(len(entities)):
+            if entities.kind[i] != KIND_TILE or not entities.in_view_band(i):
+                continue
+            if falling != (entities.y[i] >= feet):
+                continue
+            distance = abs(entities.y[i] - feet)
+            if best is None or distance < best:
+                best = distance
+                target = entities.x[i] + TILE_WIDTH / 2
+
+        if target is None:
+            return 0
+
+        # Go the short way round, allowing for the horizontal wrap-around
+        offset = (target - centre + WIDTH / 2) % WIDTH - WIDTH / 2
+        if offset < -TILE_WIDTH / 4:
+            return ACTION_LEFT
+        if offset > TILE_WIDTH / 4:
+            return ACTION_RIGHT
+        return 0
+
+    return choose
+
+
+def autopilot_policy(rng):
+    """Uses the in-game search autopilot, much slower than the others."""
+    return Autopilot(budget=0.005).choose
+
+
+# Policy factories, each takes a seeded Random and returns a function
+# mapping a World to the action for its next tick
+POLICIES = {
+    "idle": idle_policy,
+    "random": random_policy,
+    "scripted": scripted_policy,
+    "autopilot": autopilot_policy,
+}
+
+
+def play(difficulty, policy, seed, max_ticks):
+    """
+    Plays one headless game.
+
+    Returns:
+        tuple: (score, ticks, cause) where cause is "fall", "enemy" or
+        "survived" if the game hit `max_ticks`.
+    """
+    world = World(seed, difficulty)
+    choose = POLICIES[policy](random.Random(seed))
+
+    while world.ticks < max_ticks:
+        world.step(choose(world))
+        if world.game_over:
+            return world.score, world.ticks, world.death_cause
+
+    return world.score, world.ticks, "survived"
+
+
+def run_task(task):
+    """Plays a batch of games for one setting inside a pool worker."""
+    setting, difficulty, policy, first_seed, count, max_ticks = task
+    return setting, [
+        (seed,) + play(difficulty, policy, seed, max_ticks)
+        for seed in range(first_seed, first_seed + count)
+    ]
+
+
+class Summary:
+    """
+    Streaming summary of the runs of one setting, in constant memory.
+    Scores and death ticks go into fixed-width histograms, from which the
+    median score and the survival curve are read back.
+    """
+
+    def __init__(self, difficulty, max_ticks):
+        self.difficulty = difficulty
+        self.max_ticks = max_ticks
+        self.runs = 0
+        self.causes = {"fall": 0, "enemy": 0, "survived": 0}
+        self.score_bins = {}
+        self.death_bins = [0] * (max_ticks // TICK_BIN + 1)
+
+    def add(self, score, ticks, cause):
+        """Adds one finished run."""
+        self.runs += 1
+        self.causes[cause] += 1
+        score_bin = int(score // SCORE_BIN)
+        self.score_bins[score_bin] = self.score_bins.get(score_bin, 0) + 1
+        if cause != "survived":
+            self.death_bins[ticks // TICK_BIN] += 1
+
+    def median_score(self):
+        """Returns the median score, to the nearest histogram bin."""
+        seen = 0
+        for score_bin in sorted(self.score_bins):
+            seen += self.score_bins[score_bin]
+            if seen * 2 >= self.runs:
+                return (score_bin + 0.5) * SCORE_BIN
+        return 0.0
+
+    def survival(self):
+        """Returns [(ticks, fraction still alive)] at each histogram bin."""
+        alive = self.runs
+        curve = []
+        for index, deaths in enumerate(self.death_bins):
+            alive -= deaths
+            ticks = min((index + 1) * TICK_BIN, self.max_ticks)
+            curve.append((ticks, alive / self.runs if self.runs else 0.0))
+        return curve
+
+    def report(self):
+        """Returns the summary as a JSON-friendly dictionary."""
+        return {
+            "difficulty": self.difficulty,
+            "runs": self.runs,
+            "median_score": self.median_score(),
+            "deaths": {
+                cause: count / self.runs if self.runs else 0.0
+                for cause, count in self.causes.items()
+            },
+            "survival": self.survival(),
+        }
+
+
+def sweep(settings, policy, runs, max_ticks, processes, out, seed=0):
+    """
+    Plays `runs` games for every setting across a process pool, streaming
+    each run to `out` as a JSON line.
+
+    Returns:
+        list: One Summary per setting.
+    """
+    summaries = [Summary(difficulty, max_ticks) for difficulty in settings]
+
+    # Tasks are generated lazily and handed to the pool a window at a
+    # time, so even huge sweeps never queue up in memory
+    tasks = (
+        (
+            setting,
+            difficulty,
+            policy,
+            seed + first,
+            min(RUNS_PER_TASK, runs - first),
+            max_ticks,
+        )
+        for first in range(0, runs, RUNS_PER_TASK)
+        for setting, difficulty in enumerate(settings)
+    )
+
+    # Workers play under this process's physics, however they're started
+    processes = processes or os.cpu_count() or 1
+    with multiprocessing.Pool(
+        processes, initializer=apply_config, initargs=(physics(),)
+    ) as pool:
+        window = processes * TASKS_PER_WORKER
+        while True:
+            batch = list(itertools.islice(tasks, window))
+            if not batch:
+                break
+
+            for setting, results in pool.imap_unordered(run_task, batch):
+                summary = summaries[setting]
+                for run_seed, score, ticks, cause in results:
+                    summary.add(score, ticks, cause)
+                    out.write(
+                        json.dumps(
+                            {
+                                "setting": setting,
+                                "seed": run_seed,
+                                "score": score,
+                                "ticks": ticks,
+                                "cause": cause,
+                            }
+                        )
+                        + "\n"
+                    )
+
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=1000,
+                        help="games per setting")
+    parser.add_argument("--policy", choices=sorted(POLICIES),
+                        default="scripted")
+    parser.add_argument("--max-ticks", type=int, default=5000,
+                        help="ticks before a run counts as survived")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="pool size, one per CPU by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="tuner_runs.jsonl",
+                        help="file every run is streamed to")
+    parser.add_argument("--config", default=CONFIG_FILE,
+                        help="physics, and difficulty not being swept")
+    for key, default in DIFFICULTY.items():
+        parser.add_argument(
+            "--" + key.replace("_", "-"),
+            type=type(default),
+            nargs="+",
+            default=None,
+        )
+    args = parser.parse_args(argv)
+    load_config(args.config)
+
+    # Every combination of the swept values is one setting, anything not
+    # swept comes from the config
+    keys = list(DIFFICULTY)
+    settings = [
+        dict(zip(keys, values))
+        for values in itertools.product(
+            *(getattr(args, key) or [DIFFICULTY[key]] for key in keys)
+        )
+    ]
+
+    with open(args.out, "w") as out:
+        summaries = sweep(
+            settings,
+            args.policy,
+            args.runs,
+            args.max_ticks,
+            args.processes,
+            out,
+            args.seed,
+        )
+
+    reports = [summary.report() for summary in summaries]
+    with open(args.out + ".summary.json", "w") as f:
+        json.dump(reports, f, indent=2)
+
+    for report in reports:
+        deaths = report["deaths"]
+        print(
+            " ".join(f"{k}={v}" for k, v in report["difficulty"].items()),
+            f"| median score {report['median_score']:.0f}",
+            f"| fall {deaths['fall']:.1%}",
+            f"enemy {deaths['enemy']:.1%}",
+            f"survived {deaths['survived']:.1%}",
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())